@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.models.case import CaseAnalysisRequest, CaseAnalysisResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.models.case import CaseAnalysisRequest, CaseAnalysisResponse, BatchAnalysisRequest, BatchAnalysisJob
+from app.services.batch_analysis import batch_analysis_service
 from app.services.case_service import case_service
 from app.core.database import get_database
-from typing import List
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor
+from typing import List, Optional
 
 router = APIRouter()
 
@@ -10,11 +12,32 @@ router = APIRouter()
 async def analyze_case(request: CaseAnalysisRequest):
     """Analyze a legal case using IRAC method"""
     try:
-        analysis = await case_service.analyze_case(request.case_text, request.analysis_type)
+        analysis = await case_service.analyze_case(request.case_text, request.analysis_type, request.force_refresh)
         return analysis
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing case: {str(e)}")
 
+@router.post("/analyze/batch", response_model=BatchAnalysisJob, status_code=202)
+async def analyze_cases_batch(request: BatchAnalysisRequest):
+    """Start analysing many cases in the background; poll /analyze/batch/{job_id} for results"""
+    try:
+        job = await batch_analysis_service.submit(request.case_texts, request.analysis_type, request.parallelism,
+                                                  request.force_refresh)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**job.to_dict(), "items": []}
+
+@router.get("/analyze/batch/{job_id}", response_model=BatchAnalysisJob)
+async def get_batch_analysis(job_id: str, since: int = 0):
+    """
+    Batch job status. With `since` (the previous response's next_since) only
+    items finished after that poll are returned.
+    """
+    job = await batch_analysis_service.get_job(job_id, since)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch analysis job not found")
+    return job
+
 @router.get("/area/{area_of_law}")
 async def get_cases_by_area(area_of_law: str):
     """Get cases by area of law"""
@@ -52,10 +75,25 @@ async def get_legal_areas():
     }
 
 @router.get("/analyses")
-async def get_user_analyses(db=Depends(get_database)):
-    """Get user's case analyses"""
+async def get_user_analyses(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="`next` token from the previous page")
+):
+    """Get user's case analyses, newest first; pass the returned `next` as `cursor` for the following page"""
+    try:
+        return await case_service.get_user_analyses("anonymous", limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching analyses: {str(e)}")
+
+@router.get("/analyses/{analysis_id}")
+async def get_analysis(analysis_id: str):
+    """Full case analysis, including the case text"""
     try:
-        analyses = await case_service.get_user_analyses("anonymous")
-        return {"analyses": analyses}
+        analysis = await case_service.get_analysis(analysis_id, "anonymous")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching analyses: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error fetching analysis: {str(e)}")
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return analysis
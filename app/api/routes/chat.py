@@ -1,26 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
 from app.core.database import get_database
-from app.services.llm_service import llm_service
-from app.services.rag_service import rag_service
+from app.models.chat import ChatRequest, ChatResponse
+from app.services.chat_memory import get_chat_memory
+from app.services.llm_dispatcher import LLMRateLimitError
+from app.services.llm_service import aget_llm_service
+from app.services.rag_service import aget_rag_service
+from app.utils.deadline import Deadline, DeadlineExceeded
+from app.utils.latency import latency_histogram
+from app.utils.mongodb_utils import serialize_objectid
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, paginate
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
-import uuid
+import asyncio
+import json
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-class ChatRequest(BaseModel):
-    message: str
-    topic: Optional[str] = None
-
-class ChatResponse(BaseModel):
-    response: str
-    topic: Optional[str] = None
-    sources: List[str] = []
-
 class ChatSession(BaseModel):
     id: str
     user_id: str
@@ -29,10 +31,157 @@ class ChatSession(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+# Listing rows: counts and a preview of the latest message, computed server-side instead of shipping the transcript
+SESSION_LIST_PROJECTION = {
+    "id": 1,
+    "topic": 1,
+    "summary": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "message_count": {"$ifNull": ["$message_count", {"$size": {"$ifNull": ["$messages", []]}}]},
+    "preview": {"$substrCP": [{"$ifNull": [{"$arrayElemAt": ["$messages.content", -1]}, ""]}, 0, 200]}
+}
+
 # REMOVED THE MOCK FUNCTION - Using real AI services now
 
+async def _retrieve_context(request: ChatRequest, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    """
+    Packed RAG context, its token count, the cited case ids and (when the
+    semantic response cache is on) the question embedding; empty if
+    retrieval fails or runs past CHAT_RETRIEVAL_TIMEOUT_SECONDS / the deadline.
+    """
+    deadline = deadline or Deadline(settings.chat_deadline_seconds)
+    retrieved = {"context": [], "context_tokens": 0, "case_ids": None, "question_embedding": None}
+    started = time.perf_counter()
+    try:
+        rag_service = await aget_rag_service()
+        packed = await deadline.run(rag_service.aget_packed_context(
+            query=request.message, 
+            topic=request.topic
+        ), limit=settings.chat_retrieval_timeout_seconds)
+        retrieved["context"] = packed["context"]
+        retrieved["context_tokens"] = packed["stats"]["tokens_used"]
+        retrieved["case_ids"] = packed.get("case_ids")
+        logger.info(f"Retrieved {len(packed['context'])} context items from RAG ({retrieved['context_tokens']} tokens)")
+    except Exception as e:
+        logger.warning(f"RAG service error: {e}. Proceeding without context.")
+        return retrieved
+    finally:
+        latency_histogram("chat.retrieval").record(time.perf_counter() - started)
+    
+    if settings.response_cache_enabled and settings.response_cache_semantic_threshold:
+        try:
+            retrieved["question_embedding"] = await deadline.run(rag_service.aencode_query(request.message),
+                                                                 limit=settings.chat_retrieval_timeout_seconds)
+        except Exception as e:
+            logger.warning(f"Question embedding failed, semantic response cache skipped: {e}")
+    return retrieved
+
+# Outcome counters for the hedged LLM call in POST /api/chat/
+_hedge_stats = {"requests": 0, "primary_wins": 0, "hedges_started": 0, "hedge_wins": 0,
+                "deadline_exceeded": 0, "failed": 0}
+
+def get_chat_stats() -> Dict[str, Any]:
+    return {"hedging": dict(_hedge_stats), "memory": get_chat_memory().get_stats()}
+
+def _fallback_prompt(request: ChatRequest) -> str:
+    return f"As a legal tutor, please explain: {request.message} in the context of {request.topic or 'general law'}"
+
+async def _generate_hedged(request: ChatRequest, retrieved: Dict[str, Any], deadline: Deadline,
+                           history: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Race the context-grounded explanation against the plain fallback prompt.
+
+    The fallback starts CHAT_HEDGE_DELAY_SECONDS after the primary call (or
+    as soon as the primary fails), and the first successful answer within
+    the deadline wins; the loser is cancelled. Returns (text, "primary" or
+    "hedge"). Raises DeadlineExceeded, or the last LLM error if both fail.
+    """
+    llm_service = await deadline.run(aget_llm_service())
+    primary = asyncio.create_task(llm_service.generate_legal_explanation(
+        topic=request.topic or "general",
+        question=request.message,
+        context=retrieved["context"],
+        case_ids=retrieved["case_ids"],
+        question_embedding=retrieved["question_embedding"],
+        history=history
+    ))
+    hedge_at = time.monotonic() + settings.chat_hedge_delay_seconds
+    hedge = None
+    pending = {primary}
+    error: Optional[BaseException] = None
+    _hedge_stats["requests"] += 1
+    
+    def start_hedge():
+        nonlocal hedge
+        hedge = asyncio.create_task(llm_service.generate_response(_fallback_prompt(request)))
+        pending.add(hedge)
+        _hedge_stats["hedges_started"] += 1
+    
+    try:
+        while pending:
+            timeout = deadline.remaining()
+            if hedge is None and settings.chat_hedge_enabled:
+                timeout = min(timeout, max(0.0, hedge_at - time.monotonic()))
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = "primary" if task is primary else "hedge"
+                    _hedge_stats[f"{winner}_wins"] += 1
+                    return task.result(), winner
+                error = task.exception()
+                logger.warning(f"{'Primary' if task is primary else 'Hedged'} LLM call failed: {error}")
+                # A fallback call would only hit the same quota
+                if task is primary and hedge is None and not isinstance(error, LLMRateLimitError):
+                    start_hedge()
+            if not done:
+                if deadline.expired:
+                    _hedge_stats["deadline_exceeded"] += 1
+                    raise DeadlineExceeded(f"No LLM answer within the {deadline.seconds:.1f}s deadline")
+                if hedge is None and settings.chat_hedge_enabled:
+                    logger.info(f"Primary LLM call still running after {settings.chat_hedge_delay_seconds}s; hedging")
+                    start_hedge()
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+    _hedge_stats["failed"] += 1
+    raise error
+
+def _extract_sources(context: List[str]) -> List[str]:
+    """Case names cited in the context blocks"""
+    sources = []
+    # Extract case names or other identifiers from context for citation
+    for ctx in context:
+        if "Case:" in ctx:
+            case_line = ctx.split('\n')[0]  # First line usually has case name
+            case_name = case_line.replace("Case: ", "").strip()
+            if case_name and case_name != "Unknown":
+                sources.append(case_name)
+    return sources
+
+def _unavailable_response(request: ChatRequest) -> str:
+    return f"I apologize, but I'm experiencing technical difficulties. However, I can tell you that your question about '{request.message}' in {request.topic or 'general legal matters'} is important. Please try again in a moment."
+
+async def _load_session(request: ChatRequest) -> Dict[str, Any]:
+    """The request's chat session (a new one if it has no session_id or the lookup fails)"""
+    memory = get_chat_memory()
+    try:
+        return await memory.load(request.session_id, request.topic)
+    except Exception as e:
+        logger.warning(f"Chat session load failed (non-fatal): {e}")
+        return await memory.load(None, request.topic)
+
+async def _save_chat_turn(session: Dict[str, Any], request: ChatRequest, response_text: str, sources: List[str]):
+    """Append this exchange to the session (in memory when the database isn't available)"""
+    try:
+        await get_chat_memory().append_turn(session, request.message, response_text, sources)
+        logger.info(f"Chat turn saved to session {session['id']}")
+    except Exception as db_error:
+        logger.warning(f"Database save failed (non-fatal): {db_error}")
+
 @router.post("/", response_model=ChatResponse)
-async def chat(request: ChatRequest, db=Depends(get_database)):
+async def chat(request: ChatRequest):
     """Handle chat requests with AI tutor"""
     try:
         logger.info(f"Received chat request: {request.message[:100]}..., topic: {request.topic}")
@@ -41,76 +190,42 @@ async def chat(request: ChatRequest, db=Depends(get_database)):
         if not request.message or request.message.strip() == "":
             raise HTTPException(status_code=400, detail="Message cannot be empty")
         
+        # One deadline for the whole request: retrieval, the LLM call and its hedged fallback share it
+        deadline = Deadline(settings.chat_deadline_seconds)
+        
         # Get relevant context from RAG service
-        try:
-            context = rag_service.get_context_for_query(
-                query=request.message, 
-                topic=request.topic
-            )
-            logger.info(f"Retrieved {len(context)} context items from RAG")
-        except Exception as e:
-            logger.warning(f"RAG service error: {e}. Proceeding without context.")
-            context = []
+        retrieved = await _retrieve_context(request, deadline)
+        context = retrieved["context"]
         
-        # Generate response using LLM service with context
+        # Prior turns: a bounded summary plus the last few exchanges
+        session = await _load_session(request)
+        history = get_chat_memory().history_for_prompt(session)
+        
+        # Generate response using LLM service with context, hedged with a context-free fallback
+        llm_started = time.perf_counter()
         try:
-            response_text = await llm_service.generate_legal_explanation(
-                topic=request.topic or "general",
-                question=request.message,
-                context=context
-            )
-            logger.info("Generated response using LLM service")
+            response_text, winner = await _generate_hedged(request, retrieved, deadline, history)
+            logger.info(f"Generated response using LLM service ({winner} call won after {deadline.elapsed():.2f}s)")
+        except DeadlineExceeded as e:
+            logger.error(f"Chat deadline exceeded: {e}")
+            response_text = _unavailable_response(request)
         except Exception as e:
             logger.error(f"LLM service error: {e}")
-            # Fallback to basic response if LLM fails
-            try:
-                # Try basic LLM call without context as fallback
-                response_text = await llm_service.generate_response(
-                    f"As a legal tutor, please explain: {request.message} in the context of {request.topic or 'general law'}"
-                )
-                logger.info("Generated fallback response using basic LLM")
-            except Exception as fallback_error:
-                logger.error(f"Fallback LLM also failed: {fallback_error}")
-                response_text = f"I apologize, but I'm experiencing technical difficulties. However, I can tell you that your question about '{request.message}' in {request.topic or 'general legal matters'} is important. Please try again in a moment."
+            response_text = _unavailable_response(request)
+        latency_histogram("chat.llm").record(time.perf_counter() - llm_started)
         
         # Extract source information from context
-        sources = []
-        if context:
-            # Extract case names or other identifiers from context for citation
-            for ctx in context:
-                if "Case:" in ctx:
-                    case_line = ctx.split('\n')[0]  # First line usually has case name
-                    case_name = case_line.replace("Case: ", "").strip()
-                    if case_name and case_name != "Unknown":
-                        sources.append(case_name)
+        sources = _extract_sources(context)
         
-        # Save chat session if database is available
-        if db is not None:
-            try:
-                chat_session = {
-                    "id": str(uuid.uuid4()),
-                    "user_id": "anonymous",
-                    "topic": request.topic or "general",
-                    "messages": [
-                        {"role": "user", "content": request.message, "timestamp": datetime.now()},
-                        {"role": "assistant", "content": response_text, "timestamp": datetime.now()}
-                    ],
-                    "sources": sources,
-                    "created_at": datetime.now(),
-                    "updated_at": datetime.now()
-                }
-                
-                await db.chat_sessions.insert_one(chat_session)
-                logger.info("Chat session saved to database")
-            except Exception as db_error:
-                logger.warning(f"Database save failed (non-fatal): {db_error}")
-        else:
-            logger.info("Database not available, running in demo mode")
+        await _save_chat_turn(session, request, response_text, sources)
+        latency_histogram("chat.total").record(deadline.elapsed())
         
         return ChatResponse(
             response=response_text,
             topic=request.topic,
-            sources=sources
+            sources=sources,
+            session_id=session["id"],
+            context_tokens=retrieved["context_tokens"]
         )
     
     except HTTPException as he:
@@ -121,27 +236,106 @@ async def chat(request: ChatRequest, db=Depends(get_database)):
         # Don't expose internal error details to client
         raise HTTPException(status_code=500, detail="An error occurred while processing your request. Please try again.")
 
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    # JSON-encode the payload so newlines in model output can't break SSE framing
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat over server-sent events.
+
+    Emits one `sources` event (cited cases, topic, session id, context tokens), then a
+    `token` event per chunk as Gemini produces it, then `done` once the
+    transcript is saved. Failures mid-stream are sent as an `error` event.
+    """
+    if not request.message or request.message.strip() == "":
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    
+    received = time.perf_counter()
+    logger.info(f"Received streaming chat request: {request.message[:100]}..., topic: {request.topic}")
+    
+    async def events():
+        retrieved = await _retrieve_context(request)
+        sources = _extract_sources(retrieved["context"])
+        session = await _load_session(request)
+        yield _sse("sources", {"sources": sources, "topic": request.topic, "session_id": session["id"],
+                               "context_tokens": retrieved["context_tokens"]})
+        logger.info(f"Chat stream sources sent after {(time.perf_counter() - received) * 1000:.0f} ms")
+        
+        chunks = []
+        try:
+            llm_service = await aget_llm_service()
+            async for text in llm_service.stream_legal_explanation(
+                topic=request.topic or "general",
+                question=request.message,
+                context=retrieved["context"],
+                case_ids=retrieved["case_ids"],
+                question_embedding=retrieved["question_embedding"],
+                history=get_chat_memory().history_for_prompt(session)
+            ):
+                if not chunks:
+                    latency_histogram("chat.stream.first_token").record(time.perf_counter() - received)
+                    logger.info(f"Chat stream time to first token: {(time.perf_counter() - received) * 1000:.0f} ms")
+                chunks.append(text)
+                yield _sse("token", {"text": text})
+        except Exception as e:
+            logger.error(f"LLM streaming error: {e}")
+            yield _sse("error", {"message": "The response could not be completed. Please try again."})
+            return
+        
+        response_text = "".join(chunks)
+        await _save_chat_turn(session, request, response_text, sources)
+        latency_histogram("chat.stream.total").record(time.perf_counter() - received)
+        logger.info(f"Chat stream finished in {(time.perf_counter() - received) * 1000:.0f} ms "
+                    f"({len(chunks)} chunks, {len(response_text)} chars)")
+        yield _sse("done", {"chars": len(response_text)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Disable proxy buffering (nginx, Cloud Run front ends) so chunks reach the client as they're sent
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/sessions")
-async def get_chat_sessions(db=Depends(get_database)):
-    """Get user's chat sessions"""
+async def get_chat_sessions(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="`next` token from the previous page"),
+    db=Depends(get_database)
+):
+    """
+    Get user's chat sessions, most recently active first, without message
+    bodies; pass the returned `next` as `cursor` for the following page.
+    """
     try:
         if db is None:
             logger.info("Database not available, returning empty sessions")
-            return {"sessions": []}
+            return {"sessions": [], "next": None}
         
-        sessions_cursor = db.chat_sessions.find({"user_id": "anonymous"}).sort("updated_at", -1)
-        sessions = await sessions_cursor.to_list(length=50)
-        
-        # Convert ObjectId to string for JSON serialization
-        for session in sessions:
-            if "_id" in session:
-                session["_id"] = str(session["_id"])
-        
-        return {"sessions": sessions}
+        sessions, next_cursor = await paginate(
+            db.chat_sessions, {"user_id": "anonymous"}, "updated_at", SESSION_LIST_PROJECTION, limit, cursor
+        )
+        return {"sessions": serialize_objectid(sessions), "next": next_cursor}
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Sessions error: {e}")
         # Return empty sessions instead of failing
-        return {"sessions": []}
+        return {"sessions": [], "next": None}
+
+@router.get("/sessions/{session_id}")
+async def get_chat_session(session_id: str, db=Depends(get_database)):
+    """Full chat session, including every message"""
+    session = None
+    if db is not None:
+        try:
+            session = await db.chat_sessions.find_one({"id": session_id, "user_id": "anonymous"}, {"_id": 0})
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error fetching session: {str(e)}")
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return serialize_objectid(session)
 
 @router.get("/topics")
 async def get_chat_topics():
@@ -166,12 +360,14 @@ async def get_chat_topics():
 async def test_rag(query: str, topic: Optional[str] = None):
     """Test endpoint to verify RAG is working"""
     try:
-        context = rag_service.get_context_for_query(query, topic)
+        rag_service = await aget_rag_service()
+        packed = await rag_service.aget_packed_context(query, topic)
         return {
             "query": query,
             "topic": topic,
-            "context_found": len(context),
-            "context": context
+            "context_found": len(packed["context"]),
+            "context": packed["context"],
+            "packing": packed["stats"]
         }
     except Exception as e:
         logger.error(f"RAG test error: {e}")
@@ -182,6 +378,7 @@ async def test_rag(query: str, topic: Optional[str] = None):
 async def test_llm(message: str, topic: Optional[str] = None):
     """Test endpoint to verify LLM is working"""
     try:
+        llm_service = await aget_llm_service()
         response = await llm_service.generate_legal_explanation(
             topic=topic or "general",
             question=message,
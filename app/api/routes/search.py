@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from app.services.rag_service import rag_service
+from app.services.rag_service import aget_rag_service, build_where
+from app.core.config import settings
 from app.core.database import get_database
 from typing import Optional
 
@@ -9,27 +10,68 @@ router = APIRouter()
 async def search_cases(
     q: str = Query(..., description="Search query"),
     area: Optional[str] = Query(None, description="Filter by area of law"),
-    limit: int = Query(10, ge=1, le=50, description="Number of results to return")
+    court: Optional[str] = Query(None, description="Filter by court"),
+    year: Optional[int] = Query(None, description="Filter by decision year"),
+    limit: int = Query(10, ge=1, le=50, description="Number of results to return"),
+    mode: Optional[str] = Query(None, pattern="^(vector|lexical|hybrid)$",
+                                description="Retrieval mode: vector, lexical (BM25 only, fastest) or hybrid")
 ):
-    """Search legal cases using semantic similarity"""
+    """Search legal cases using semantic, lexical or hybrid retrieval"""
     try:
         if not q.strip():
             raise HTTPException(status_code=400, detail="Search query cannot be empty")
         
-        # Add area filter to query if provided
-        search_query = f"{area} {q}" if area else q
+        # Pre-filter on case metadata rather than steering the query text
+        where = build_where(area=area, court=court, year=year)
         
-        results = rag_service.search_similar_cases(search_query, n_results=limit)
+        rag_service = await aget_rag_service()
+        results = await rag_service.asearch_similar_cases(q, n_results=limit, mode=mode, where=where)
         
         return {
             "query": q,
             "area": area,
+            "court": court,
+            "year": year,
+            "mode": mode or settings.default_search_mode,
             "results": results,
             "total": len(results)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching cases: {str(e)}")
 
+@router.get("/passages")
+async def search_passages(
+    q: str = Query(..., description="Search query"),
+    area: Optional[str] = Query(None, description="Filter by area of law"),
+    court: Optional[str] = Query(None, description="Filter by court"),
+    year: Optional[int] = Query(None, description="Filter by decision year"),
+    limit: int = Query(5, ge=1, le=20, description="Number of cases to return"),
+    passages_per_case: int = Query(2, ge=1, le=10, description="Passages returned per case")
+):
+    """Search case passages, returning the best-matching passages grouped by case"""
+    try:
+        if not q.strip():
+            raise HTTPException(status_code=400, detail="Search query cannot be empty")
+        
+        rag_service = await aget_rag_service()
+        results = await rag_service.asearch_passages(
+            q,
+            n_cases=limit,
+            passages_per_case=passages_per_case,
+            where=build_where(area=area, court=court, year=year)
+        )
+        
+        return {
+            "query": q,
+            "area": area,
+            "results": results,
+            "total": len(results)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching passages: {str(e)}")
+
 @router.get("/statutes")
 async def search_statutes(
     q: str = Query(..., description="Search query"),
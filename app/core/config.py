@@ -10,12 +10,87 @@ load_dotenv()
 class Settings(BaseSettings):
     mongodb_url: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     database_name: str = os.getenv("DATABASE_NAME", "legal_education_ai")
+    mongo_ensure_indexes: bool = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+    mongo_verify_query_plans: bool = os.getenv("MONGO_VERIFY_QUERY_PLANS", "true").lower() == "true"  # explain() hot queries at startup
     google_api_key: str = os.getenv("GOOGLE_API_KEY", "")
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key")
     algorithm: str = os.getenv("ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     environment: str = os.getenv("ENVIRONMENT", "development")
     chroma_persist_directory: str = os.getenv("CHROMA_PERSIST_DIRECTORY", "./data/embeddings")
+    vector_store: str = os.getenv("VECTOR_STORE", "chroma")  # "chroma", "numpy"
+    numpy_store_directory: str = os.getenv("NUMPY_STORE_DIRECTORY", "./data/vectors")
+    numpy_store_dtype: str = os.getenv("NUMPY_STORE_DTYPE", "float32")  # "float32", "float16"
+    cases_data_directory: str = os.getenv("CASES_DATA_DIRECTORY", "data/cases")
+    ingest_batch_size: int = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+    corpus_sync_on_startup: bool = os.getenv("CORPUS_SYNC_ON_STARTUP", "true").lower() == "true"
+    embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    embedding_model_name: str = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+    embedding_backend: str = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")  # "sentence-transformers", "torch-int8", "onnx", "onnx-int8"
+    onnx_model_directory: str = os.getenv("ONNX_MODEL_DIRECTORY", "./data/models/minilm-onnx")
+    onnx_intra_op_threads: int = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = onnxruntime default
+    passage_index_enabled: bool = os.getenv("PASSAGE_INDEX_ENABLED", "true").lower() == "true"
+    passage_max_words: int = int(os.getenv("PASSAGE_MAX_WORDS", "120"))
+    passage_overlap_words: int = int(os.getenv("PASSAGE_OVERLAP_WORDS", "30"))
+    context_cases: int = int(os.getenv("CONTEXT_CASES", "3"))
+    context_passages_per_case: int = int(os.getenv("CONTEXT_PASSAGES_PER_CASE", "2"))
+    context_candidate_cases: int = int(os.getenv("CONTEXT_CANDIDATE_CASES", "6"))  # retrieved before packing
+    context_token_budget: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+    context_max_sentences: int = int(os.getenv("CONTEXT_MAX_SENTENCES", "3"))  # per passage/field
+    context_dedupe_threshold: float = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", "0.8"))
+    retrieval_socket: str = os.getenv("RETRIEVAL_SOCKET", "")  # set: workers use the shared retrieval sidecar
+    retrieval_sidecar_enabled: bool = os.getenv("RETRIEVAL_SIDECAR_ENABLED", "true").lower() == "true"
+    retrieval_connect_timeout_seconds: float = float(os.getenv("RETRIEVAL_CONNECT_TIMEOUT_SECONDS", "180"))
+    retrieval_max_idle_connections: int = int(os.getenv("RETRIEVAL_MAX_IDLE_CONNECTIONS", "16"))  # per worker
+    rag_worker_threads: int = int(os.getenv("RAG_WORKER_THREADS", "4"))
+    query_batch_max_size: int = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+    query_batch_wait_ms: float = float(os.getenv("QUERY_BATCH_WAIT_MS", "5"))
+    query_cache_max_entries: int = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "10000"))
+    query_cache_max_mb: float = float(os.getenv("QUERY_CACHE_MAX_MB", "32"))
+    query_cache_ttl_seconds: float = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+    chat_deadline_seconds: float = float(os.getenv("CHAT_DEADLINE_SECONDS", "25"))
+    chat_retrieval_timeout_seconds: float = float(os.getenv("CHAT_RETRIEVAL_TIMEOUT_SECONDS", "3"))
+    chat_hedge_enabled: bool = os.getenv("CHAT_HEDGE_ENABLED", "true").lower() == "true"
+    chat_hedge_delay_seconds: float = float(os.getenv("CHAT_HEDGE_DELAY_SECONDS", "8"))
+    chat_memory_turns: int = int(os.getenv("CHAT_MEMORY_TURNS", "4"))  # exchanges kept verbatim in the prompt
+    chat_memory_message_tokens: int = int(os.getenv("CHAT_MEMORY_MESSAGE_TOKENS", "250"))
+    chat_memory_summary_tokens: int = int(os.getenv("CHAT_MEMORY_SUMMARY_TOKENS", "300"))
+    chat_memory_max_local_sessions: int = int(os.getenv("CHAT_MEMORY_MAX_LOCAL_SESSIONS", "1000"))
+    session_writer_max_queue: int = int(os.getenv("SESSION_WRITER_MAX_QUEUE", "10000"))
+    session_writer_batch_size: int = int(os.getenv("SESSION_WRITER_BATCH_SIZE", "200"))
+    session_writer_flush_seconds: float = float(os.getenv("SESSION_WRITER_FLUSH_SECONDS", "0.25"))
+    session_writer_drain_timeout_seconds: float = float(os.getenv("SESSION_WRITER_DRAIN_TIMEOUT_SECONDS", "10"))
+    analysis_cache_max_entries: int = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "1000"))
+    batch_analysis_parallelism: int = int(os.getenv("BATCH_ANALYSIS_PARALLELISM", "4"))
+    batch_analysis_max_parallelism: int = int(os.getenv("BATCH_ANALYSIS_MAX_PARALLELISM", "16"))
+    batch_analysis_max_items: int = int(os.getenv("BATCH_ANALYSIS_MAX_ITEMS", "500"))
+    batch_analysis_job_ttl_seconds: float = float(os.getenv("BATCH_ANALYSIS_JOB_TTL_SECONDS", "3600"))
+    batch_analysis_flush_seconds: float = float(os.getenv("BATCH_ANALYSIS_FLUSH_SECONDS", "1"))
+    llm_backend: str = os.getenv("LLM_BACKEND", "gemini")  # "gemini", "fake", "record", "replay"
+    llm_model_name: str = os.getenv("LLM_MODEL_NAME", "gemini-1.5-flash")
+    llm_fake_latency_ms: float = float(os.getenv("LLM_FAKE_LATENCY_MS", "400"))
+    llm_fake_tokens_per_second: float = float(os.getenv("LLM_FAKE_TOKENS_PER_SECOND", "50"))
+    llm_fake_response_tokens: int = int(os.getenv("LLM_FAKE_RESPONSE_TOKENS", "300"))
+    llm_fake_error_rate: float = float(os.getenv("LLM_FAKE_ERROR_RATE", "0"))
+    llm_recording_path: str = os.getenv("LLM_RECORDING_PATH", "./data/llm_recordings.jsonl")
+    llm_replay_timing: bool = os.getenv("LLM_REPLAY_TIMING", "true").lower() == "true"
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    llm_rate_limit_per_second: float = float(os.getenv("LLM_RATE_LIMIT_PER_SECOND", "5"))  # 0 disables
+    llm_rate_limit_burst: int = int(os.getenv("LLM_RATE_LIMIT_BURST", "10"))
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    llm_retry_base_delay_seconds: float = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "0.5"))
+    llm_retry_max_delay_seconds: float = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "8"))
+    llm_single_flight_enabled: bool = os.getenv("LLM_SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+    response_cache_enabled: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    response_cache_max_entries: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+    response_cache_max_mb: float = float(os.getenv("RESPONSE_CACHE_MAX_MB", "64"))
+    response_cache_ttl_seconds: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+    response_cache_semantic_threshold: float = float(os.getenv("RESPONSE_CACHE_SEMANTIC_THRESHOLD", "0.92"))  # 0 disables
+    response_cache_semantic_max_entries: int = int(os.getenv("RESPONSE_CACHE_SEMANTIC_MAX_ENTRIES", "2000"))
+    response_cache_persistent: bool = os.getenv("RESPONSE_CACHE_PERSISTENT", "false").lower() == "true"  # MongoDB tier
+    default_search_mode: str = os.getenv("DEFAULT_SEARCH_MODE", "hybrid")  # "vector", "lexical", "hybrid"
+    hybrid_candidate_multiplier: int = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "3"))
+    rrf_k: int = int(os.getenv("RRF_K", "60"))
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,149 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Indexes each collection needs, keyed to the queries below. Names are left to
+# MongoDB's defaults so declarations match indexes that already exist.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "chat_sessions": [
+        IndexModel([("id", ASCENDING)], unique=True),  # session lookups and write-behind upserts
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]),  # session list pages
+    ],
+    "case_analyses": [
+        IndexModel([("id", ASCENDING)]),  # analysis detail
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),  # user history pages
+        # Analysis dedup: unique so concurrent upserts of the same text can't both insert (the hash
+        # covers the analysis type); partial so documents from before hashing don't collide on null
+        IndexModel([("content_hash", ASCENDING)], unique=True,
+                   partialFilterExpression={"content_hash": {"$exists": True}}),
+    ],
+    "learning_progress": [
+        IndexModel([("user_id", ASCENDING), ("module_id", ASCENDING), ("lesson_id", ASCENDING)], unique=True),
+    ],
+    "user_progress": [
+        IndexModel([("user_id", ASCENDING), ("module_id", ASCENDING), ("lesson_id", ASCENDING)], unique=True),
+    ],
+    "statutes": [
+        # $text queries fail outright without a text index
+        IndexModel([("title", TEXT), ("section", TEXT), ("content", TEXT)],
+                   weights={"title": 5, "section": 3, "content": 1}, name="statutes_text"),
+        IndexModel([("jurisdiction", ASCENDING)]),
+    ],
+}
+
+# (name, collection, filter, sort) of the queries the API runs on every request
+HOT_QUERIES: List[Tuple[str, str, Dict[str, Any], Optional[List[Tuple[str, int]]]]] = [
+    ("chat_session_by_id", "chat_sessions", {"id": "probe"}, None),
+    ("chat_sessions_by_user", "chat_sessions", {"user_id": "anonymous"},
+     [("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ("case_analyses_by_user", "case_analyses", {"user_id": "anonymous"},
+     [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("case_analysis_by_id", "case_analyses", {"id": "probe", "user_id": "anonymous"}, None),
+    ("case_analysis_by_hash", "case_analyses", {"content_hash": "probe"}, [("updated_at", DESCENDING)]),
+    ("learning_progress_by_lesson", "learning_progress",
+     {"user_id": "anonymous", "module_id": "probe", "lesson_id": "probe"}, None),
+    ("learning_progress_by_user", "learning_progress", {"user_id": "anonymous"}, None),
+    ("user_progress_by_lesson", "user_progress",
+     {"user_id": "anonymous", "module_id": "probe", "lesson_id": "probe"}, None),
+    ("user_progress_completed", "user_progress", {"user_id": "anonymous", "completed": True}, None),
+    ("statutes_text_search", "statutes", {"$text": {"$search": "contract"}}, None),
+]
+
+async def ensure_indexes(db) -> Dict[str, Any]:
+    """
+    Create every declared index that is missing.
+
+    Index builds are idempotent, so this runs on each startup. A failure on
+    one index (e.g. duplicates blocking a unique index) is logged and
+    reported without stopping the others.
+    """
+    report = {"ensured": [], "failed": {}, "duplicates": {}}
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                names = await db[collection].create_indexes([index])
+                report["ensured"].extend(f"{collection}.{name}" for name in names)
+            except Exception as e:
+                name = f"{collection}.{index.document['name']}"
+                report["failed"][name] = str(e)
+                logger.warning(f"Could not ensure index {index.document['name']} on {collection}: {e}")
+                if index.document.get("unique"):
+                    duplicates = await find_duplicates(db, collection, index)
+                    if duplicates:
+                        report["duplicates"][name] = duplicates
+                        logger.warning(f"Duplicate documents in {collection} block unique index "
+                                       f"{index.document['name']}; remove them and restart. First: {duplicates[0]}")
+    logger.info(f"Ensured {len(report['ensured'])} MongoDB indexes ({len(report['failed'])} failed)")
+    return report
+
+async def find_duplicates(db, collection: str, index: IndexModel, limit: int = 10) -> List[Dict[str, Any]]:
+    """Key values shared by several documents, which stop a unique index from being built"""
+    fields = list(index.document["key"])
+    pipeline = [
+        {"$match": index.document.get("partialFilterExpression", {})},
+        {"$group": {"_id": {field.replace(".", "_"): f"${field}" for field in fields},
+                    "count": {"$sum": 1}, "ids": {"$push": "$_id"}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    try:
+        groups = await db[collection].aggregate(pipeline, allowDiskUse=True).to_list(length=limit)
+    except Exception as e:
+        logger.warning(f"Duplicate check on {collection} failed: {e}")
+        return []
+    return [{"key": group["_id"], "count": group["count"], "ids": [str(i) for i in group["ids"][:5]]}
+            for group in groups]
+
+def _plan_stages(plan: Any) -> List[str]:
+    # Every "stage" in an explain plan tree (classic inputStage(s) and SBE queryPlan layouts alike)
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+async def verify_query_plans(db) -> List[Dict[str, Any]]:
+    """
+    Explain each hot query and flag the ones whose winning plan scans the
+    whole collection (or that can't be planned at all).
+    """
+    results = []
+    for name, collection, query, sort in HOT_QUERIES:
+        result = {"query": name, "collection": collection}
+        try:
+            cursor = db[collection].find(query).limit(50)
+            if sort:
+                cursor = cursor.sort(sort)
+            explain = await cursor.explain()
+            stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+            result["stages"] = stages
+            result["status"] = "collscan" if "COLLSCAN" in stages else "ok"
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+        if result["status"] != "ok":
+            logger.warning(f"Query plan check: {name} on {collection} -> {result['status']} "
+                           f"{result.get('error') or result.get('stages')}")
+        results.append(result)
+    return results
+
+index_report: Dict[str, Any] = {"indexes": None, "query_plans": None}
+
+async def bootstrap_indexes(db, verify: bool = True) -> Dict[str, Any]:
+    """Startup hook: ensure the indexes, then optionally check the hot query plans"""
+    index_report["indexes"] = await ensure_indexes(db)
+    if verify:
+        plans = await verify_query_plans(db)
+        index_report["query_plans"] = {
+            "checked": len(plans),
+            "flagged": [plan for plan in plans if plan["status"] != "ok"]
+        }
+    return index_report
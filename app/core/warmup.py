@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class Readiness:
+    """Tracks background startup of the heavy components and their timings"""
+
+    COMPONENTS = ("database", "embedding_model", "vector_index", "llm")
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.components: Dict[str, Dict[str, Any]] = {
+            name: {"status": "pending", "seconds": None} for name in self.COMPONENTS
+        }
+
+    def mark(self, name: str, status: str, seconds: Optional[float] = None, error: Optional[str] = None):
+        self.components[name] = {"status": status, "seconds": seconds}
+        if error:
+            self.components[name]["error"] = error
+
+    @property
+    def ready(self) -> bool:
+        # "skipped" covers optional components that aren't configured (e.g. demo mode without a DB)
+        return all(c["status"] in ("ready", "skipped") for c in self.components.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = None
+        if self.started_at is not None:
+            end = self.finished_at or time.perf_counter()
+            total = round(end - self.started_at, 3)
+        return {
+            "ready": self.ready,
+            "warmup_seconds": total,
+            "components": self.components
+        }
+
+readiness = Readiness()
+
+async def _warm_database():
+    from app.core.config import settings
+    from app.core.database import connect_db
+
+    started = time.perf_counter()
+    try:
+        connected = await connect_db()
+    except Exception as e:
+        readiness.mark("database", "failed", round(time.perf_counter() - started, 3), str(e))
+        return
+    elapsed = round(time.perf_counter() - started, 3)
+    if connected:
+        logger.info("✅ Database connected successfully")
+        if settings.mongo_ensure_indexes:
+            await _bootstrap_indexes(settings.mongo_verify_query_plans)
+            elapsed = round(time.perf_counter() - started, 3)
+        readiness.mark("database", "ready", elapsed)
+    elif not settings.mongodb_url or settings.mongodb_url == "mongodb://localhost:27017":
+        logger.info("⚠️  Running without database (demo mode)")
+        readiness.mark("database", "skipped", elapsed)
+    else:
+        readiness.mark("database", "failed", elapsed, "connection failed")
+
+async def _bootstrap_indexes(verify: bool):
+    from app.core.database import get_database
+    from app.core.indexes import bootstrap_indexes
+
+    try:
+        await bootstrap_indexes(await get_database(), verify=verify)
+    except Exception as e:
+        # Missing indexes make queries slower, not wrong; don't hold the database back over it
+        logger.warning(f"⚠️  Index bootstrap failed: {e}")
+
+async def _warm_rag():
+    from app.services.rag_service import get_rag_service
+
+    readiness.mark("embedding_model", "loading")
+    readiness.mark("vector_index", "loading")
+    try:
+        rag_service = await asyncio.to_thread(get_rag_service)
+        started = time.perf_counter()
+        await asyncio.to_thread(rag_service.warm_up)
+        timings = rag_service.startup_timings
+        readiness.mark("embedding_model", "ready",
+                       round(timings.get("embedding_model", 0) + time.perf_counter() - started, 3))
+        readiness.mark("vector_index", "ready", timings.get("vector_index"))
+    except Exception as e:
+        logger.error(f"❌ RAG warmup failed: {e}")
+        readiness.mark("embedding_model", "failed", error=str(e))
+        readiness.mark("vector_index", "failed", error=str(e))
+
+async def _warm_llm():
+    from app.services.llm_service import get_llm_service
+
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(get_llm_service)
+        readiness.mark("llm", "ready", round(time.perf_counter() - started, 3))
+    except Exception as e:
+        logger.error(f"❌ LLM warmup failed: {e}")
+        readiness.mark("llm", "failed", round(time.perf_counter() - started, 3), str(e))
+
+async def warm_up():
+    """Bring up the database, retrieval stack and LLM client concurrently"""
+    readiness.started_at = time.perf_counter()
+    await asyncio.gather(_warm_database(), _warm_rag(), _warm_llm())
+    readiness.finished_at = time.perf_counter()
+    logger.info(f"🔥 Warmup finished in {readiness.to_dict()['warmup_seconds']}s (ready={readiness.ready})")
@@ -1,7 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(
@@ -13,8 +16,17 @@ logger = logging.getLogger(__name__)
 # Import your modules with error handling
 try:
     from app.core.config import settings
-    from app.core.database import connect_db, close_db
+    from app.core.database import close_db
+    from app.core.indexes import index_report
+    from app.core.warmup import readiness, warm_up
     from app.api.routes import chat, cases, learning, search
+    from app.services.batch_analysis import batch_analysis_service
+    from app.services.case_service import case_service
+    from app.services.session_writer import session_writer
+    from app.services.llm_service import get_llm_service, is_llm_service_loaded
+    from app.services.rag_service import get_rag_service, is_rag_service_loaded
+    from app.utils.latency import latency_stats
+    from app.utils.memory import rss_mb
     HAS_MODULES = True
     logger.info("✅ All modules imported successfully")
 except ImportError as e:
@@ -26,23 +38,26 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting LegalMind AI Backend...")
     
+    # Database, embedding model, vector index and LLM client warm up in the
+    # background so the server binds its port immediately; see /ready
+    warmup_task = None
     if HAS_MODULES:
-        try:
-            db_connected = await connect_db()
-            if db_connected:
-                logger.info("✅ Database connected successfully")
-            else:
-                logger.info("⚠️  Running without database (demo mode)")
-        except Exception as e:
-            logger.warning(f"⚠️  Database connection failed: {e}")
-            logger.info("Continuing without database...")
+        warmup_task = asyncio.create_task(warm_up())
+        # Chat turns are persisted write-behind; drained below before the database closes
+        session_writer.start()
     
-    logger.info("🎯 Backend startup complete")
+    logger.info("🎯 Backend startup complete (warmup continues in background)")
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down...")
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
     if HAS_MODULES:
+        try:
+            await session_writer.stop(settings.session_writer_drain_timeout_seconds)
+        except Exception as e:
+            logger.warning(f"Shutdown warning: {e}")
         try:
             await close_db()
         except Exception as e:
@@ -94,11 +109,14 @@ async def root():
         "database_connected": HAS_MODULES,
         "endpoints": [
             "/health",
+            "/ready",
             "/api/chat/",
+            "/api/chat/stream",
             "/api/chat/sessions",
             "/api/chat/topics",
             "/api/learning/stats",
-            "/api/cases/analyses"
+            "/api/cases/analyses",
+            "/api/cases/analyze/batch"
         ]
     }
 
@@ -112,6 +130,37 @@ async def health_check():
         "modules_loaded": HAS_MODULES
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the model, vector index, DB and LLM client are warm"""
+    if not HAS_MODULES:
+        return JSONResponse(status_code=503, content={"ready": False, "modules_loaded": False})
+    body = readiness.to_dict()
+    if settings.retrieval_socket:
+        # Workers can't serve retrieval while the sidecar is down (e.g. being restarted by run.py)
+        available = await get_rag_service().ping()
+        body["retrieval_sidecar"] = "up" if available else "down"
+        body["ready"] = body["ready"] and available
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime statistics for internal services"""
+    if not HAS_MODULES:
+        return {"modules_loaded": False}
+    return {
+        "modules_loaded": True,
+        "process": {"pid": os.getpid(), "rss_mb": round(rss_mb(), 1)},
+        "rag": await get_rag_service().aget_stats() if is_rag_service_loaded() else None,
+        "llm": get_llm_service().get_stats() if is_llm_service_loaded() else None,
+        "chat": chat.get_chat_stats(),
+        "session_writer": session_writer.get_stats(),
+        "latency": latency_stats(),
+        "case_analyses": case_service.get_stats(),
+        "batch_analysis": batch_analysis_service.get_stats(),
+        "indexes": index_report
+    }
+
 @app.get("/api/test")
 async def test_endpoint():
     """Test endpoint to verify API is working"""
@@ -5,6 +5,7 @@ from datetime import datetime
 class CaseAnalysisRequest(BaseModel):
     case_text: str
     analysis_type: str = "irac"  # "irac", "brief", "summary"
+    force_refresh: bool = False  # re-run the LLM even if this text was analyzed before
 
 class CaseAnalysisResponse(BaseModel):
     issue: str
@@ -13,6 +14,37 @@ class CaseAnalysisResponse(BaseModel):
     conclusion: str
     key_facts: List[str]
     legal_principles: List[str]
+    cached: bool = False
+
+class BatchAnalysisRequest(BaseModel):
+    case_texts: List[str]
+    analysis_type: str = "irac"
+    parallelism: Optional[int] = None  # defaults to BATCH_ANALYSIS_PARALLELISM
+    force_refresh: bool = False
+
+class BatchAnalysisItem(BaseModel):
+    index: int
+    status: str  # "pending", "running", "done", "failed"
+    sequence: Optional[int] = None  # completion order, for incremental polling
+    analysis: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    duration_ms: Optional[float] = None
+    cached: bool = False
+
+class BatchAnalysisJob(BaseModel):
+    job_id: str
+    status: str  # "running", "completed"
+    analysis_type: str
+    total: int
+    completed: int = 0
+    failed: int = 0
+    stored: int = 0
+    parallelism: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+    items: List[BatchAnalysisItem] = []
+    next_since: int = 0
 
 class LegalCase(BaseModel):
     id: Optional[str] = None
@@ -12,6 +12,7 @@ class ChatResponse(BaseModel):
     topic: Optional[str] = None
     sources: List[str] = []
     session_id: Optional[str] = None
+    context_tokens: int = 0
 
 class ChatMessage(BaseModel):
     role: str  # "user" or "assistant"
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.services.case_service import analysis_content_hash, case_service
+from app.services.llm_service import aget_llm_service
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_JOBS_COLLECTION = "analysis_jobs"
+
+class BatchAnalysisJob:
+    """State of one batch: per-item status, results and timing"""
+
+    def __init__(self, case_texts: List[str], analysis_type: str, parallelism: int, force_refresh: bool = False):
+        self.job_id = str(uuid.uuid4())
+        self.case_texts = case_texts
+        self.analysis_type = analysis_type
+        self.parallelism = parallelism
+        self.force_refresh = force_refresh
+        self.content_hashes = [analysis_content_hash(text, analysis_type) for text in case_texts]
+        self.status = "running"
+        self.items = [{"index": index, "status": "pending", "sequence": None, "analysis": None,
+                       "error": None, "duration_ms": None, "cached": False} for index in range(len(case_texts))]
+        self.completed = 0
+        self.failed = 0
+        self.stored = 0
+        self.sequence = 0
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def finish_item(self, index: int, analysis: Optional[Dict[str, Any]], error: Optional[str], seconds: float,
+                    cached: bool = False):
+        self.sequence += 1
+        item = self.items[index]
+        item.update(status="failed" if error else "done", sequence=self.sequence, analysis=analysis,
+                    error=error, duration_ms=round(seconds * 1000, 1), cached=cached)
+        if error:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    def finish(self):
+        self.status = "completed"
+        self.finished_at = datetime.now()
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+
+    def to_dict(self, since: int = 0) -> Dict[str, Any]:
+        """Job summary plus the items finished after completion number `since` (all items when 0)"""
+        if since:
+            items = sorted((item for item in self.items if (item["sequence"] or 0) > since),
+                           key=lambda item: item["sequence"])
+        else:
+            items = self.items
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "analysis_type": self.analysis_type,
+            "total": len(self.items),
+            "completed": self.completed,
+            "failed": self.failed,
+            "stored": self.stored,
+            "parallelism": self.parallelism,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "duration_ms": self.duration_ms,
+            "items": [dict(item) for item in items],
+            "next_since": self.sequence
+        }
+
+class BatchAnalysisService:
+    """
+    Runs batches of case analyses in the background.
+
+    Items are analysed concurrently, at most `parallelism` at a time (the
+    LLM dispatcher still bounds total Gemini concurrency across requests).
+    Texts analysed before are answered from CaseService's content-hash
+    dedup unless the job forces a refresh. Progress lives in memory and is
+    mirrored to `analysis_jobs` (throttled) so any worker can answer status
+    polls; new analyses go to `case_analyses` in one bulk write at the end.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, BatchAnalysisJob] = {}
+        self._last_flush: Dict[str, float] = {}
+
+    def _evict_finished(self):
+        cutoff = time.time() - settings.batch_analysis_job_ttl_seconds
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at is not None and job.finished_at.timestamp() < cutoff:
+                del self.jobs[job_id]
+
+    async def submit(self, case_texts: List[str], analysis_type: str = "irac",
+                     parallelism: Optional[int] = None, force_refresh: bool = False) -> BatchAnalysisJob:
+        """Start analysing `case_texts`; returns immediately with the job"""
+        if not case_texts:
+            raise ValueError("case_texts cannot be empty")
+        if len(case_texts) > settings.batch_analysis_max_items:
+            raise ValueError(f"A batch can hold at most {settings.batch_analysis_max_items} cases")
+        if any(not text or not text.strip() for text in case_texts):
+            raise ValueError("case_texts cannot contain empty case text")
+        parallelism = max(1, min(parallelism or settings.batch_analysis_parallelism,
+                                 settings.batch_analysis_max_parallelism))
+
+        self._evict_finished()
+        job = BatchAnalysisJob(case_texts, analysis_type, parallelism, force_refresh)
+        self.jobs[job.job_id] = job
+        await self._flush_progress(job, force=True)
+        job.task = asyncio.create_task(self._run(job))
+        logger.info(f"Batch analysis {job.job_id}: {len(case_texts)} cases, parallelism {parallelism}")
+        return job
+
+    async def _run(self, job: BatchAnalysisJob):
+        semaphore = asyncio.Semaphore(job.parallelism)
+        llm_service = None
+
+        async def analyze(index: int, case_text: str):
+            async with semaphore:
+                job.items[index]["status"] = "running"
+                started = time.perf_counter()
+                try:
+                    cached = None
+                    if not job.force_refresh:
+                        cached = await case_service.get_cached_analysis(job.content_hashes[index])
+                    if cached is not None:
+                        job.finish_item(index, cached, None, time.perf_counter() - started, cached=True)
+                    else:
+                        analysis = await llm_service.analyze_legal_case(case_text, strict=True)
+                        job.finish_item(index, analysis, None, time.perf_counter() - started)
+                except Exception as e:
+                    job.finish_item(index, None, f"{type(e).__name__}: {e}", time.perf_counter() - started)
+            await self._flush_progress(job)
+
+        try:
+            try:
+                llm_service = await aget_llm_service()
+            except Exception as e:
+                # Without a backend no item can run; fail them all so pollers see a finished job
+                for item in job.items:
+                    if item["status"] in ("pending", "running"):
+                        job.finish_item(item["index"], None, f"LLM service unavailable: {type(e).__name__}: {e}", 0.0)
+                raise
+            await asyncio.gather(*(analyze(index, text) for index, text in enumerate(job.case_texts)))
+            await self._store_results(job)
+        except Exception as e:
+            logger.error(f"Batch analysis {job.job_id} failed: {e}")
+        finally:
+            job.finish()
+            await self._flush_progress(job, force=True)
+            logger.info(f"Batch analysis {job.job_id} finished in {job.duration_ms:.0f} ms "
+                        f"({job.completed} done, {job.failed} failed, {job.stored} stored)")
+
+    async def _store_results(self, job: BatchAnalysisJob):
+        analyses = [{
+            "case_text": job.case_texts[item["index"]],
+            "analysis_type": job.analysis_type,
+            "analysis": item["analysis"],
+            "content_hash": job.content_hashes[item["index"]]
+        } for item in job.items if item["status"] == "done" and not item["cached"]]
+        job.stored = await case_service.save_analyses(analyses, batch_job_id=job.job_id)
+
+    async def _flush_progress(self, job: BatchAnalysisJob, force: bool = False):
+        # Mirror progress to MongoDB for polls that land on another worker, at most once per interval
+        now = time.monotonic()
+        if not force and now - self._last_flush.get(job.job_id, 0.0) < settings.batch_analysis_flush_seconds:
+            return
+        self._last_flush[job.job_id] = now
+        db = await get_database()
+        if db is None:
+            return
+        try:
+            snapshot = job.to_dict()
+            await db[ANALYSIS_JOBS_COLLECTION].replace_one(
+                {"_id": job.job_id}, {"_id": job.job_id, **snapshot, "updated_at": datetime.now()}, upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to save batch analysis progress (non-fatal): {e}")
+        if job.status == "completed":
+            self._last_flush.pop(job.job_id, None)
+
+    async def get_job(self, job_id: str, since: int = 0) -> Optional[Dict[str, Any]]:
+        """Status of a job started by any worker; None if unknown"""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict(since)
+
+        db = await get_database()
+        if db is None:
+            return None
+        document = await db[ANALYSIS_JOBS_COLLECTION].find_one({"_id": job_id})
+        if document is None:
+            return None
+        document.pop("_id", None)
+        document.pop("updated_at", None)
+        if since:
+            document["items"] = sorted((item for item in document["items"] if (item.get("sequence") or 0) > since),
+                                       key=lambda item: item["sequence"])
+        return document
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": len(self.jobs),
+            "running": sum(1 for job in self.jobs.values() if job.status == "running"),
+            "items_pending": sum(len(job.items) - job.completed - job.failed for job in self.jobs.values())
+        }
+
+batch_analysis_service = BatchAnalysisService()
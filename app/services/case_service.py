@@ -1,9 +1,16 @@
-from app.services.llm_service import llm_service
-from app.services.rag_service import rag_service
+from app.services.llm_service import aget_llm_service
+from app.services.rag_service import aget_rag_service, build_where
+from app.core.config import settings
 from app.core.database import get_database
-from typing import List, Dict, Any
+from app.utils.cache import LRUCache
+from app.utils.pagination import DEFAULT_PAGE_SIZE, InvalidCursor, paginate
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+import hashlib
+import re
 import uuid
 
 def serialize_objectid(obj):
@@ -18,50 +25,190 @@ def serialize_objectid(obj):
         return obj.isoformat()
     return obj
 
+def analysis_content_hash(case_text: str, analysis_type: str) -> str:
+    """Key for deduplicating analyses: the whitespace/case-normalized text plus the analysis type"""
+    normalized = re.sub(r'\s+', ' ', case_text or '').strip().lower()
+    return hashlib.sha256(f"{analysis_type}\n{normalized}".encode("utf-8")).hexdigest()
+
+PREVIEW_CHARS = 200
+
+# Listing rows: the case text is cut down server-side so full texts never leave MongoDB
+ANALYSIS_LIST_PROJECTION = {
+    "id": 1,
+    "analysis_type": 1,
+    "area_of_law": 1,
+    "created_at": 1,
+    "issue": "$analysis.issue",
+    "case_preview": {"$substrCP": [{"$ifNull": ["$case_text", ""]}, 0, PREVIEW_CHARS]}
+}
+
+MOCK_ANALYSES = [
+    {
+        "id": "1",
+        "case_text": "Sample case text for contract breach...",
+        "analysis_type": "irac",
+        "analysis": {
+            "issue": "Whether defendant breached the contract",
+            "rule": "A contract is breached when a party fails to perform",
+            "application": "Defendant failed to deliver goods as promised",
+            "conclusion": "Defendant breached the contract"
+        },
+        "created_at": "2024-01-15T10:30:00",
+        "area_of_law": "contract_law"
+    },
+    {
+        "id": "2",
+        "case_text": "Sample negligence case involving car accident...",
+        "analysis_type": "irac",
+        "analysis": {
+            "issue": "Whether defendant was negligent in the accident",
+            "rule": "Negligence requires duty, breach, causation, and damages",
+            "application": "Defendant ran red light, causing collision",
+            "conclusion": "Defendant was negligent"
+        },
+        "created_at": "2024-01-10T14:20:00",
+        "area_of_law": "tort_law"
+    }
+]
+
+def _slim_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    # Same shape as ANALYSIS_LIST_PROJECTION, for the demo-mode rows
+    return {
+        "id": analysis["id"],
+        "analysis_type": analysis["analysis_type"],
+        "area_of_law": analysis.get("area_of_law"),
+        "created_at": analysis["created_at"],
+        "issue": (analysis.get("analysis") or {}).get("issue"),
+        "case_preview": analysis["case_text"][:PREVIEW_CHARS]
+    }
+
 class CaseService:
     def __init__(self):
         self.db = None
+        # Serves repeat analyses when MongoDB is down (and saves a round trip when it's up)
+        self._analysis_cache = LRUCache(max_entries=settings.analysis_cache_max_entries)
+        self.analysis_stats = {"memory_hits": 0, "database_hits": 0, "misses": 0, "refreshes": 0}
     
     async def _get_db(self):
-        if not self.db:
-            self.db = get_database()
+        if self.db is None:
+            self.db = await get_database()
         return self.db
     
-    async def analyze_case(self, case_text: str, analysis_type: str = "irac") -> Dict[str, Any]:
-        """Analyze a legal case using AI"""
-        try:
-            analysis = await llm_service.analyze_legal_case(case_text)
-            
-            # Save analysis to database
-            db = await self._get_db()
-            case_analysis = {
-                "id": str(uuid.uuid4()),
-                "case_text": case_text,
-                "analysis_type": analysis_type,
-                "analysis": analysis,
-                "user_id": "anonymous",  # Replace with actual user ID
-                "created_at": datetime.now()
-            }
-            
-            await db.case_analyses.insert_one(case_analysis)
-            
+    async def get_cached_analysis(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """A previous analysis with this content hash, from memory or MongoDB"""
+        analysis = self._analysis_cache.get(content_hash)
+        if analysis is not None:
+            self.analysis_stats["memory_hits"] += 1
             return analysis
+        
+        db = await self._get_db()
+        if db is not None:
+            try:
+                document = await db.case_analyses.find_one(
+                    {"content_hash": content_hash}, {"analysis": 1}, sort=[("updated_at", -1)]
+                )
+                if document is not None:
+                    self._analysis_cache.set(content_hash, document["analysis"])
+                    self.analysis_stats["database_hits"] += 1
+                    return document["analysis"]
+            except Exception as e:
+                print(f"Error looking up cached analysis: {e}")
+        self.analysis_stats["misses"] += 1
+        return None
+    
+    async def save_analyses(self, analyses: List[Dict[str, Any]], batch_job_id: Optional[str] = None) -> int:
+        """
+        Upsert analyses (dicts of case_text, analysis_type, analysis,
+        content_hash) into case_analyses with one bulk write, one document
+        per content hash. Returns how many documents were written.
+        """
+        # Same text submitted twice in one batch -> one document
+        analyses = list({item["content_hash"]: item for item in analyses}.values())
+        for item in analyses:
+            self._analysis_cache.set(item["content_hash"], item["analysis"])
+        db = await self._get_db()
+        if db is None or not analyses:
+            return 0
+        
+        now = datetime.now()
+        operations = []
+        for item in analyses:
+            update = {"analysis": item["analysis"], "updated_at": now}
+            if batch_job_id:
+                update["batch_job_id"] = batch_job_id
+            operations.append(UpdateOne(
+                # Equality on the unique content_hash index, so concurrent upserts of one text converge
+                {"content_hash": item["content_hash"]},
+                {
+                    "$set": update,
+                    "$setOnInsert": {
+                        "id": str(uuid.uuid4()),
+                        "analysis_type": item["analysis_type"],
+                        "case_text": item["case_text"],
+                        "user_id": "anonymous",  # Replace with actual user ID
+                        "created_at": now
+                    }
+                },
+                upsert=True
+            ))
+        try:
+            result = await db.case_analyses.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # A concurrent request inserted the same hash first; retrying turns those upserts into updates
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            result = await db.case_analyses.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+    
+    async def analyze_case(self, case_text: str, analysis_type: str = "irac",
+                           force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Analyze a legal case using AI.
+
+        Repeat submissions of the same (normalized) text and analysis type
+        are answered from the stored analysis without calling the LLM,
+        unless `force_refresh` is set. The result carries `cached`.
+        """
+        content_hash = analysis_content_hash(case_text, analysis_type)
+        if force_refresh:
+            self.analysis_stats["refreshes"] += 1
+        else:
+            cached = await self.get_cached_analysis(content_hash)
+            if cached is not None:
+                return {**cached, "cached": True}
+        
+        try:
+            llm_service = await aget_llm_service()
+            analysis = await llm_service.analyze_legal_case(case_text, strict=True)
         except Exception as e:
             print(f"Error in analyze_case: {e}")
-            # Return mock analysis if service fails
+            # Return mock analysis if service fails (never stored or cached)
             return {
                 "issue": "What legal issue is presented in this case?",
                 "rule": "The applicable legal rule or statute",
                 "application": "How the rule applies to the facts",
                 "conclusion": "The likely outcome based on the analysis",
                 "key_facts": ["Fact 1", "Fact 2", "Fact 3"],
-                "legal_principles": ["Principle 1", "Principle 2"]
+                "legal_principles": ["Principle 1", "Principle 2"],
+                "cached": False
             }
+        
+        # Save analysis to database (only the in-process cache in demo mode without one)
+        try:
+            await self.save_analyses([{"case_text": case_text, "analysis_type": analysis_type,
+                                       "analysis": analysis, "content_hash": content_hash}])
+        except Exception as e:
+            print(f"Error saving analysis: {e}")
+        return {**analysis, "cached": False}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.analysis_stats, "memory_cache": self._analysis_cache.get_stats()}
     
     async def get_cases_by_area(self, area_of_law: str) -> List[Dict[str, Any]]:
         """Get cases filtered by area of law"""
         try:
-            cases = rag_service.search_similar_cases(area_of_law, n_results=10)
+            rag_service = await aget_rag_service()
+            cases = await rag_service.aget_cases_by_metadata(build_where(area=area_of_law), limit=10)
             return serialize_objectid(cases)
         except Exception as e:
             print(f"Error in get_cases_by_area: {e}")
@@ -80,7 +227,8 @@ class CaseService:
     async def search_cases(self, query: str) -> List[Dict[str, Any]]:
         """Search cases using RAG similarity search"""
         try:
-            cases = rag_service.search_similar_cases(query, n_results=10)
+            rag_service = await aget_rag_service()
+            cases = await rag_service.asearch_similar_cases(query, n_results=10)
             return serialize_objectid(cases)
         except Exception as e:
             print(f"Error in search_cases: {e}")
@@ -95,47 +243,33 @@ class CaseService:
                 }
             ]
     
-    async def get_user_analyses(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get user's case analyses"""
-        try:
-            db = await self._get_db()
-            analyses_cursor = db.case_analyses.find({"user_id": user_id}).sort("created_at", -1)
-            analyses = await analyses_cursor.to_list(length=50)
-            
-            # Convert ObjectIds to strings before returning
-            serialized_analyses = serialize_objectid(analyses)
-            return serialized_analyses
-            
-        except Exception as e:
-            print(f"Error in get_user_analyses: {e}")
-            # Return mock analyses if database fails
-            return [
-                {
-                    "id": "1",
-                    "case_text": "Sample case text for contract breach...",
-                    "analysis_type": "irac",
-                    "analysis": {
-                        "issue": "Whether defendant breached the contract",
-                        "rule": "A contract is breached when a party fails to perform",
-                        "application": "Defendant failed to deliver goods as promised",
-                        "conclusion": "Defendant breached the contract"
-                    },
-                    "created_at": "2024-01-15T10:30:00",
-                    "area_of_law": "contract_law"
-                },
-                {
-                    "id": "2", 
-                    "case_text": "Sample negligence case involving car accident...",
-                    "analysis_type": "irac",
-                    "analysis": {
-                        "issue": "Whether defendant was negligent in the accident",
-                        "rule": "Negligence requires duty, breach, causation, and damages",
-                        "application": "Defendant ran red light, causing collision",
-                        "conclusion": "Defendant was negligent"
-                    },
-                    "created_at": "2024-01-10T14:20:00",
-                    "area_of_law": "tort_law"
-                }
-            ]
+    async def get_user_analyses(self, user_id: str, limit: int = DEFAULT_PAGE_SIZE,
+                                cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of the user's case analyses, newest first, as slim rows
+        (preview of the case text and the issue; full analysis via get_analysis).
+        Raises InvalidCursor for a bad `cursor`.
+        """
+        db = await self._get_db()
+        if db is not None:
+            try:
+                analyses, next_cursor = await paginate(
+                    db.case_analyses, {"user_id": user_id}, "created_at", ANALYSIS_LIST_PROJECTION, limit, cursor
+                )
+                return {"analyses": serialize_objectid(analyses), "next": next_cursor}
+            except InvalidCursor:
+                raise
+            except Exception as e:
+                print(f"Error in get_user_analyses: {e}")
+        # Return mock analyses if database is unavailable or fails
+        return {"analyses": [_slim_analysis(analysis) for analysis in MOCK_ANALYSES[:limit]], "next": None}
+    
+    async def get_analysis(self, analysis_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """The full stored analysis document, or None if there is none with this id"""
+        db = await self._get_db()
+        if db is None:
+            return next((dict(analysis) for analysis in MOCK_ANALYSES if analysis["id"] == analysis_id), None)
+        analysis = await db.case_analyses.find_one({"id": analysis_id, "user_id": user_id}, {"_id": 0})
+        return serialize_objectid(analysis) if analysis is not None else None
 
 case_service = CaseService()
\ No newline at end of file
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.services.context_packer import estimate_tokens
+from app.services.session_writer import session_writer
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max_tokens * 4].rsplit(" ", 1)[0] + " ..."
+
+class ChatMemory:
+    """
+    Session-aware chat history with a bounded prompt footprint.
+
+    Sessions keep the full transcript in `chat_sessions` (written behind by
+    the session writer; an in-process LRU in demo mode), but prompts only ever see the running `summary` plus
+    the exchanges not yet folded into it, each message trimmed to
+    `message_tokens`. Once `compact_turns` exchanges beyond the last
+    `recent_turns` have built up, the LLM folds them into the summary in the
+    background and `summarized_messages` advances past them, so a prompt
+    carries at most recent_turns + compact_turns exchanges.
+    """
+
+    def __init__(self, recent_turns: int = 4, message_tokens: int = 250, summary_tokens: int = 300,
+                 max_local_sessions: int = 1000, compact_turns: Optional[int] = None):
+        self.recent_turns = recent_turns
+        # Compacting in chunks rather than every turn keeps summarization to one LLM call per few turns
+        self.compact_turns = compact_turns or max(1, recent_turns // 2)
+        self.message_tokens = message_tokens
+        self.summary_tokens = summary_tokens
+        self._local = LRUCache(max_entries=max_local_sessions)
+        self._compacting: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"sessions_created": 0, "sessions_loaded": 0, "turns_saved": 0, "compactions": 0,
+                      "messages_compacted": 0, "compaction_failures": 0}
+
+    def _window(self) -> int:
+        # Messages loaded per session: the verbatim window plus room for one pending compaction
+        return self.recent_turns * 4
+
+    async def load(self, session_id: Optional[str], topic: Optional[str] = None) -> Dict[str, Any]:
+        """The session's summary and most recent messages; a new empty session if unknown or None"""
+        if session_id:
+            db = await get_database()
+            session = None
+            if db is not None:
+                session = await db.chat_sessions.find_one(
+                    {"id": session_id},
+                    {"_id": 0, "id": 1, "topic": 1, "summary": 1, "summarized_messages": 1, "message_count": 1,
+                     "messages": {"$slice": -self._window()}}
+                )
+                # Turns this process has queued but not yet flushed
+                pending = session_writer.pending_messages(session_id)
+                if pending:
+                    session = session or {"id": session_id, "topic": topic or "general", "summary": "",
+                                          "summarized_messages": 0, "message_count": 0, "messages": []}
+                    session["messages"] = (session.get("messages", []) + pending)[-self._window():]
+                    session["message_count"] = session.get("message_count", 0) + len(pending)
+            else:
+                session = self._local.get(session_id)
+            if session is not None:
+                self.stats["sessions_loaded"] += 1
+                return session
+        self.stats["sessions_created"] += 1
+        return {"id": session_id or str(uuid.uuid4()), "topic": topic or "general", "summary": "",
+                "summarized_messages": 0, "message_count": 0, "messages": [], "new": True}
+
+    def _unsummarized(self, session: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Loaded messages not yet folded into the summary (the loaded list is the tail of the transcript)"""
+        messages = session.get("messages", [])
+        first_loaded = session.get("message_count", len(messages)) - len(messages)
+        skip = max(0, session.get("summarized_messages", 0) - first_loaded)
+        return messages[skip:]
+
+    def history_for_prompt(self, session: Dict[str, Any]) -> str:
+        """Summary plus the unsummarized exchanges, bounded regardless of conversation length"""
+        parts = []
+        if session.get("summary"):
+            parts.append(f"Summary of earlier conversation: {session['summary']}")
+        for message in self._unsummarized(session)[-(self.recent_turns + self.compact_turns) * 2:]:
+            role = "Student" if message["role"] == "user" else "Tutor"
+            parts.append(f"{role}: {_truncate_to_tokens(message['content'], self.message_tokens)}")
+        return "\n".join(parts)
+
+    async def append_turn(self, session: Dict[str, Any], user_message: str, assistant_message: str,
+                          sources: Optional[List[str]] = None):
+        """Record one exchange, then compact older turns in the background if the window overflowed"""
+        now = datetime.now()
+        new_messages = [
+            {"role": "user", "content": user_message, "timestamp": now},
+            {"role": "assistant", "content": assistant_message, "timestamp": now, "sources": sources or []}
+        ]
+        session["messages"] = (session.get("messages", []) + new_messages)[-self._window():]
+        session["message_count"] = session.get("message_count", 0) + len(new_messages)
+
+        db = await get_database()
+        if db is not None and session_writer.running:
+            session_writer.enqueue(session["id"], new_messages, session.get("topic"), sources)
+        elif db is not None:
+            await db.chat_sessions.update_one(
+                {"id": session["id"]},
+                {
+                    "$push": {"messages": {"$each": new_messages}},
+                    "$inc": {"message_count": len(new_messages)},
+                    "$set": {"sources": sources or [], "updated_at": now},
+                    "$setOnInsert": {"user_id": "anonymous", "topic": session.get("topic") or "general",
+                                     "summary": "", "summarized_messages": 0, "created_at": now}
+                },
+                upsert=True
+            )
+        else:
+            self._local.set(session["id"], {key: value for key, value in session.items() if key != "new"})
+        self.stats["turns_saved"] += 1
+
+        overflow_turns = len(self._unsummarized(session)) // 2 - self.recent_turns
+        if overflow_turns >= self.compact_turns and session["id"] not in self._compacting:
+            self._compacting.add(session["id"])
+            task = asyncio.create_task(self._compact(dict(session)))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _compact(self, session: Dict[str, Any]):
+        try:
+            unsummarized = self._unsummarized(session)
+            overflow = unsummarized[:len(unsummarized) - self.recent_turns * 2]
+            if not overflow:
+                return
+            from app.services.llm_service import aget_llm_service
+
+            llm_service = await aget_llm_service()
+            summary = await llm_service.summarize_conversation(session.get("summary", ""), overflow,
+                                                               self.summary_tokens)
+            summary = _truncate_to_tokens(summary.strip(), self.summary_tokens)
+            previous = session.get("summarized_messages", 0)
+            summarized = session["message_count"] - self.recent_turns * 2
+
+            db = await get_database()
+            if db is not None:
+                # Guarded on the old position so a concurrent compaction can't fold the same turns twice
+                result = await db.chat_sessions.update_one(
+                    {"id": session["id"], "summarized_messages": previous},
+                    {"$set": {"summary": summary, "summarized_messages": summarized}}
+                )
+                applied = result.matched_count > 0
+            else:
+                stored = self._local.get(session["id"])
+                applied = stored is not None and stored.get("summarized_messages", 0) == previous
+                if applied:
+                    stored.update(summary=summary, summarized_messages=summarized)
+            if not applied:
+                # The session document isn't written yet (turns still queued in the session writer) or
+                # another compaction moved it on; the turns stay unsummarized and a later turn retries
+                self.stats["compaction_failures"] += 1
+                logger.info(f"Compaction of chat session {session['id']} not applied: session not yet "
+                            f"persisted or already compacted")
+                return
+            self.stats["compactions"] += 1
+            self.stats["messages_compacted"] += len(overflow)
+            logger.info(f"Compacted {len(overflow)} messages of chat session {session['id']} into its summary")
+        except Exception as e:
+            # Non-fatal: the prompt stays bounded (it only uses the recent window) and the next turn retries
+            self.stats["compaction_failures"] += 1
+            logger.warning(f"Chat session compaction failed: {e}")
+        finally:
+            self._compacting.discard(session["id"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "compacting": len(self._compacting), "local_sessions": len(self._local)}
+
+_chat_memory: Optional[ChatMemory] = None
+
+def get_chat_memory() -> ChatMemory:
+    global _chat_memory
+    if _chat_memory is None:
+        _chat_memory = ChatMemory(
+            recent_turns=settings.chat_memory_turns,
+            message_tokens=settings.chat_memory_message_tokens,
+            summary_tokens=settings.chat_memory_summary_tokens,
+            max_local_sessions=settings.chat_memory_max_local_sessions
+        )
+    return _chat_memory
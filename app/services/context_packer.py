@@ -0,0 +1,140 @@
+import math
+from typing import Any, Dict, List, Optional, Set
+
+from app.services.lexical_index import tokenize
+from app.utils.text_processing import split_sentences
+
+# Long-form case fields used when a search result carries the whole case rather than passages
+CASE_FIELDS = ("facts", "holding", "reasoning")
+
+# Words too common to say anything about which sentence answers the query
+STOPWORDS = frozenset("""
+    a an and are as at be been but by can did do does for from had has have how i if in into is it its
+    may not of on or that the their there these this to was were what when where which who why will with
+""".split())
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 characters per token for English prose)"""
+    return math.ceil(len(text) / 4) if text else 0
+
+def _shingles(text: str, size: int = 3) -> Set[tuple]:
+    tokens = tokenize(text)
+    if len(tokens) < size:
+        return {tuple(tokens)} if tokens else set()
+    return {tuple(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+def _jaccard(a: Set[tuple], b: Set[tuple]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+class ContextPacker:
+    """
+    Assembles retrieved cases into prompt context under a token budget.
+
+    Snippets (matched passages, or the fields of whole cases) are ranked by
+    retrieval score, near-duplicates are dropped, each snippet is trimmed to
+    its sentences most relevant to the query, and snippets are added best
+    first until the budget is spent. Output blocks keep the
+    "Case: <name>\\n<Field>: <text>" shape the chat route reads sources from.
+    """
+
+    def __init__(self, token_budget: int = 1200, max_cases: int = 3, max_sentences: int = 3,
+                 dedupe_threshold: float = 0.8):
+        self.token_budget = token_budget
+        self.max_cases = max_cases
+        self.max_sentences = max_sentences
+        self.dedupe_threshold = dedupe_threshold
+
+    def _snippets(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        snippets = []
+        for result in results:
+            case = result.get("case") or {}
+            if "passages" in result:
+                sources = [(p["field"], p["text"], p.get("similarity", result.get("similarity", 0.0)))
+                           for p in result["passages"]]
+            else:
+                sources = [(field, str(case.get(field) or ''), result.get("similarity", 0.0))
+                           for field in CASE_FIELDS]
+            for field, text, score in sources:
+                if text.strip():
+                    snippets.append({
+                        "case_id": result.get("id") or case.get("case_name", "Unknown"),
+                        "case_name": case.get("case_name", "Unknown"),
+                        "field": field,
+                        "text": text,
+                        "score": float(score or 0.0)
+                    })
+        # Stable sort: equal scores keep retrieval order (facts before holding for whole cases)
+        snippets.sort(key=lambda snippet: -snippet["score"])
+        return snippets
+
+    def _rank_sentences(self, text: str, query_terms: Set[str]) -> List[tuple]:
+        """(relevance, position, sentence), most query-relevant first"""
+        ranked = []
+        for position, sentence in enumerate(split_sentences(text)):
+            terms = set(tokenize(sentence))
+            ranked.append((len(terms & query_terms), position, sentence))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked
+
+    def pack(self, query: str, results: List[Dict[str, Any]],
+             token_budget: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Pack `results` (from search_passages or search_similar_cases) for `query`.
+
+        Returns {"context": [block, ...], "case_ids": [...], "stats": {...}} where
+        stats report the budget, estimated tokens used and what was dropped or
+        trimmed.
+        """
+        budget = token_budget or self.token_budget
+        query_terms = {term for term in tokenize(query) if term not in STOPWORDS}
+        snippets = self._snippets(results)
+        stats = {"token_budget": budget, "tokens_used": 0, "cases": 0, "snippets_considered": len(snippets),
+                 "snippets_used": 0, "duplicates_dropped": 0, "sentences_trimmed": 0, "case_limit_dropped": 0,
+                 "over_budget_dropped": 0}
+
+        kept_shingles: List[Set[tuple]] = []
+        cases: Dict[str, Dict[str, Any]] = {}
+        used = 0
+        for snippet in snippets:
+            shingles = _shingles(snippet["text"])
+            if any(_jaccard(shingles, other) >= self.dedupe_threshold for other in kept_shingles):
+                stats["duplicates_dropped"] += 1
+                continue
+
+            case = cases.get(snippet["case_id"])
+            cost_header = 0
+            if case is None:
+                if len(cases) >= self.max_cases:
+                    stats["case_limit_dropped"] += 1
+                    continue
+                cost_header = estimate_tokens(f"Case: {snippet['case_name']}\n")
+
+            # Take the most relevant sentences that fit, then restore their original order
+            ranked = self._rank_sentences(snippet["text"], query_terms)
+            label = f"{snippet['field'].title()}: "
+            cost = cost_header + estimate_tokens(label)
+            chosen = []
+            for relevance, position, sentence in ranked[:self.max_sentences]:
+                sentence_cost = estimate_tokens(sentence + " ")
+                if used + cost + sentence_cost > budget:
+                    break
+                chosen.append((position, sentence))
+                cost += sentence_cost
+            stats["sentences_trimmed"] += len(ranked) - len(chosen)
+            if not chosen:
+                stats["over_budget_dropped"] += 1
+                continue
+
+            if case is None:
+                case = cases[snippet["case_id"]] = {"case_name": snippet["case_name"], "lines": []}
+            case["lines"].append(label + " ".join(sentence for _, sentence in sorted(chosen)))
+            kept_shingles.append(shingles)
+            used += cost
+            stats["snippets_used"] += 1
+
+        stats["tokens_used"] = used
+        stats["cases"] = len(cases)
+        context = [f"Case: {case['case_name']}\n" + "\n".join(case["lines"]) for case in cases.values()]
+        return {"context": context, "case_ids": list(cases.keys()), "stats": stats}
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.utils.case_loader import iter_case_file, list_case_files
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+def default_manifest_path() -> str:
+    """The manifest lives next to the vector index it describes"""
+    if settings.vector_store == "numpy":
+        return os.path.join(settings.numpy_store_directory, "corpus_manifest.json")
+    return os.path.join(settings.chroma_persist_directory, "corpus_manifest.json")
+
+# Ids the ingestion used before stable_case_id: str(hash(case_text)), salted per process
+LEGACY_CASE_ID = re.compile(r"-?\d+$")
+
+def embedding_signature(model_name: str, backend: str) -> str:
+    """
+    What the index's vectors were encoded with. The backend is part of it:
+    quantized (int8/ONNX) vectors don't mix with fp32 ones of the same model.
+    """
+    return f"{model_name}:{backend}"
+
+def _with_backend(signature: Optional[str]) -> Optional[str]:
+    # Manifests written before the backend was recorded were always sentence-transformers
+    if signature and ":" not in signature:
+        return embedding_signature(signature, "sentence-transformers")
+    return signature
+
+def case_content_hash(case: Dict[str, Any]) -> str:
+    """Stable hash of a case's full content (key order and process independent)"""
+    canonical = json.dumps(case, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def stable_case_id(case: Dict[str, Any], content_hash: Optional[str] = None) -> str:
+    """
+    The case's own id, or a content-derived id that is the same in every
+    process (unlike the built-in, per-process salted hash()).
+    """
+    if case.get('id'):
+        return str(case['id'])
+    return "case_" + (content_hash or case_content_hash(case))[:16]
+
+def scan_corpus(data_dir: str, failed_files: Optional[Dict[str, str]] = None
+                ) -> Iterator[Tuple[str, str, str, Dict[str, Any]]]:
+    """
+    Yield (case_id, content_hash, source_file, case) for every case file in
+    data_dir. A file that can't be parsed is skipped from the error on (and
+    recorded in `failed_files` as source -> error) instead of ending the scan.
+    """
+    for path in list_case_files(data_dir):
+        source = os.path.basename(path)
+        try:
+            for case in iter_case_file(path):
+                content_hash = case_content_hash(case)
+                yield stable_case_id(case, content_hash), content_hash, source, case
+        except (ValueError, OSError, UnicodeDecodeError, TypeError, AttributeError) as e:
+            logger.warning(f"Skipping unreadable case file {source}: {e}")
+            if failed_files is not None:
+                failed_files[source] = str(e)
+
+class CorpusManifest:
+    """
+    On-disk record of which case ids are indexed and the content hash each
+    was indexed from, so re-syncs only re-embed what changed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.embedding_model: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: str) -> "CorpusManifest":
+        manifest = cls(path)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                manifest.entries = data.get("cases", {})
+                manifest.embedding_model = data.get("embedding_model")
+        return manifest
+
+    def save(self) -> None:
+        """Write atomically so an interrupted sync never leaves a truncated manifest"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "embedding_model": self.embedding_model,
+                "cases": self.entries
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def is_current(self, case_id: str, content_hash: str) -> bool:
+        entry = self.entries.get(case_id)
+        return entry is not None and entry.get("hash") == content_hash
+
+    def record(self, case_id: str, content_hash: str, source: Optional[str] = None) -> None:
+        self.entries[case_id] = {"hash": content_hash, "source": source}
+
+    def remove(self, case_id: str) -> None:
+        self.entries.pop(case_id, None)
+
+    def removed_ids(self, seen: Set[str], failed_files: Dict[str, str]) -> List[str]:
+        """Indexed cases no longer in the corpus; cases of files that failed to parse are kept"""
+        return [case_id for case_id, entry in self.entries.items()
+                if case_id not in seen and entry.get("source") not in failed_files]
+
+    def needs_rebuild(self, embedding_model: str) -> bool:
+        """True if the index was encoded with another model or backend (see embedding_signature)"""
+        return _with_backend(self.embedding_model) != embedding_model
+
+    def plan(self, data_dir: str, embedding_model: str) -> Dict[str, int]:
+        """
+        Count what a sync would do without embedding anything: new, changed,
+        unchanged and removed cases. A different embedding model or backend
+        makes every case "changed".
+        """
+        rebuild = self.needs_rebuild(embedding_model)
+        counts = {"new": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        seen = set()
+        failed_files: Dict[str, str] = {}
+        for case_id, content_hash, _, _ in scan_corpus(data_dir, failed_files):
+            seen.add(case_id)
+            if case_id not in self.entries:
+                counts["new"] += 1
+            elif rebuild or not self.is_current(case_id, content_hash):
+                counts["changed"] += 1
+            else:
+                counts["unchanged"] += 1
+        counts["removed"] = len(self.removed_ids(seen, failed_files))
+        counts["failed_files"] = len(failed_files)
+        return counts
@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("sentence-transformers", "torch-int8", "onnx", "onnx-int8")
+
+ONNX_FILENAME = "model.onnx"
+ONNX_INT8_FILENAME = "model.int8.onnx"
+ONNX_CONFIG_FILENAME = "embedder_config.json"
+
+class Embedder:
+    """
+    Interface for the text embedding model behind RAGService.
+
+    `encode` mirrors SentenceTransformer.encode for a list of texts and
+    returns a float32 array of shape (len(texts), dimension).
+    """
+
+    name: str = "base"
+    dimension: int = 0
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        raise NotImplementedError
+
+class SentenceTransformerEmbedder(Embedder):
+    """The reference PyTorch SentenceTransformer model"""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=batch_size, **kwargs), dtype=np.float32)
+
+class QuantizedTorchEmbedder(SentenceTransformerEmbedder):
+    """SentenceTransformer with its Linear layers dynamically quantized to int8"""
+
+    name = "torch-int8"
+
+    def __init__(self, model_name: str):
+        import torch
+
+        super().__init__(model_name)
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+class OnnxEmbedder(Embedder):
+    """
+    ONNX Runtime CPU embedder over a transformer exported with export_onnx_model.
+
+    Reproduces the SentenceTransformer pipeline (tokenize, transformer,
+    mean pooling, optional L2 normalisation) without loading PyTorch.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.name = "onnx-int8" if quantized else "onnx"
+        model_path = os.path.join(model_dir, ONNX_INT8_FILENAME if quantized else ONNX_FILENAME)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} not found; run `python manage.py export-onnx` to create it"
+            )
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILENAME)) as f:
+            config = json.load(f)
+        self.dimension = config["dimension"]
+        self.normalize = config["normalize"]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=config["pad_token_id"], pad_token=config["pad_token"])
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            feed = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            feed = {name: value for name, value in feed.items() if name in self.input_names}
+            token_embeddings = self.session.run(None, feed)[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = feed["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32))
+        return np.vstack(batches)
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = True) -> str:
+    """
+    Export a SentenceTransformer's transformer to ONNX (plus an int8 copy).
+
+    Only needed once per model; the exported directory is what the "onnx"
+    and "onnx-int8" backends load at runtime.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    os.makedirs(output_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    pooling = next((module for module in st_model if isinstance(module, Pooling)), None)
+    if pooling is not None and not pooling.pooling_mode_mean_tokens:
+        raise ValueError("Only mean-pooling SentenceTransformer models can be exported")
+
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    tokenizer.save_pretrained(output_dir)
+
+    class _TokenEmbeddings(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids)[0]
+
+    dummy = tokenizer(["export the embedding model"], return_tensors="pt")
+    if "token_type_ids" not in dummy:
+        dummy["token_type_ids"] = torch.zeros_like(dummy["input_ids"])
+    model_path = os.path.join(output_dir, ONNX_FILENAME)
+    export_kwargs = dict(
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["token_embeddings"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "token_type_ids": {0: "batch", 1: "sequence"},
+            "token_embeddings": {0: "batch", 1: "sequence"},
+        },
+        opset_version=14,
+    )
+    args = (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"])
+    with torch.no_grad():
+        try:
+            torch.onnx.export(_TokenEmbeddings(transformer), args, model_path, dynamo=False, **export_kwargs)
+        except TypeError:
+            # Older torch releases have no `dynamo` switch (TorchScript export is the only path)
+            torch.onnx.export(_TokenEmbeddings(transformer), args, model_path, **export_kwargs)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(model_path, os.path.join(output_dir, ONNX_INT8_FILENAME), weight_type=QuantType.QInt8)
+
+    config = {
+        "model_name": model_name,
+        "dimension": st_model.get_sentence_embedding_dimension(),
+        "max_seq_length": st_model.max_seq_length,
+        "normalize": any(isinstance(module, Normalize) for module in st_model),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILENAME), "w") as f:
+        json.dump(config, f, indent=2)
+    logger.info(f"Exported {model_name} to {output_dir}")
+    return output_dir
+
+def create_embedder(backend: Optional[str] = None) -> Embedder:
+    """Build the embedder selected by settings.embedding_backend (or `backend`)"""
+    from app.core.config import settings
+
+    backend = backend or settings.embedding_backend
+    if backend == "sentence-transformers":
+        return SentenceTransformerEmbedder(settings.embedding_model_name)
+    if backend == "torch-int8":
+        return QuantizedTorchEmbedder(settings.embedding_model_name)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEmbedder(settings.onnx_model_directory, quantized=backend == "onnx-int8",
+                            threads=settings.onnx_intra_op_threads)
+    raise ValueError(f"Unknown embedding backend: {backend} (expected one of {', '.join(EMBEDDING_BACKENDS)})")
@@ -0,0 +1,145 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Metadata fields that get their own document partitions for pre-filtered search
+PARTITION_FIELDS = ("area_of_law", "court", "year")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens; keeps citation parts like '1893', 'qb', '256' intact"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class BM25Index:
+    """
+    In-process BM25 inverted index over case documents.
+
+    Documents can be added, replaced and removed incrementally. Each document
+    keeps its metadata so lexical-only searches can be answered without
+    touching the vector store. Documents are also partitioned by
+    PARTITION_FIELDS so filtered searches only score the matching partition.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_lengths: Dict[str, int] = {}
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._documents: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        self._partitions: Dict[Tuple[str, Any], Set[str]] = defaultdict(set)
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Index a document, replacing any previous version with the same id"""
+        metadata = metadata or {}
+        # Citations aren't part of the embedded text but are exactly what lexical search is for
+        indexed_text = f"{text} {metadata.get('citation', '')}"
+        term_counts = Counter(tokenize(indexed_text))
+        with self._lock:
+            if doc_id in self._doc_lengths:
+                self._remove_locked(doc_id)
+            for term, count in term_counts.items():
+                self._postings[term][doc_id] = count
+            length = sum(term_counts.values())
+            self._doc_lengths[doc_id] = length
+            self._doc_terms[doc_id] = list(term_counts)
+            self._documents[doc_id] = (metadata, text)
+            for field in PARTITION_FIELDS:
+                if field in metadata:
+                    self._partitions[(field, metadata[field])].add(doc_id)
+            self._total_length += length
+
+    def add_many(self, docs: Iterable[Tuple[str, str, Dict[str, Any]]]) -> None:
+        for doc_id, text, metadata in docs:
+            self.add(doc_id, text, metadata)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            if doc_id in self._doc_lengths:
+                self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: str) -> None:
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        metadata, _ = self._documents.pop(doc_id)
+        for field in PARTITION_FIELDS:
+            if field in metadata:
+                partition = self._partitions[(field, metadata[field])]
+                partition.discard(doc_id)
+                if not partition:
+                    del self._partitions[(field, metadata[field])]
+
+    def get_document(self, doc_id: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        return self._documents.get(doc_id)
+
+    def has_partition(self, field: str, value: Any) -> bool:
+        return (field, value) in self._partitions
+
+    def partition_values(self, field: str) -> List[Any]:
+        return sorted({value for partition_field, value in self._partitions if partition_field == field}, key=str)
+
+    def filter_ids(self, where: Dict[str, Any]) -> Set[str]:
+        """Ids of documents whose metadata matches every field in `where`"""
+        with self._lock:
+            matches: Optional[Set[str]] = None
+            for field, value in where.items():
+                if field in PARTITION_FIELDS:
+                    ids = self._partitions.get((field, value), set())
+                else:
+                    ids = {doc_id for doc_id, (metadata, _) in self._documents.items()
+                           if metadata.get(field) == value}
+                matches = set(ids) if matches is None else matches & ids
+                if not matches:
+                    return set()
+            return matches if matches is not None else set(self._documents)
+
+    def search(self, query: str, n_results: int = 10,
+               where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """Return up to n_results (doc_id, score) pairs, best first, optionally pre-filtered by metadata"""
+        query_terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not query_terms or doc_count == 0:
+                return []
+            candidates = self.filter_ids(where) if where else None
+            if candidates is not None and not candidates:
+                return []
+            avg_length = self._total_length / doc_count
+            scores: Dict[str, float] = defaultdict(float)
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                if candidates is not None and len(candidates) < len(postings):
+                    # Walk the (smaller) partition instead of the full posting list
+                    matches = ((doc_id, postings[doc_id]) for doc_id in candidates if doc_id in postings)
+                elif candidates is not None:
+                    matches = ((doc_id, tf) for doc_id, tf in postings.items() if doc_id in candidates)
+                else:
+                    matches = postings.items()
+                for doc_id, tf in matches:
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists; each id scores sum(1 / (k + rank))"""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
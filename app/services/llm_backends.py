@@ -0,0 +1,243 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_BACKENDS = ("gemini", "fake", "record", "replay")
+
+class LLMBackend:
+    """
+    Interface for the text generation model behind LLMService.
+
+    Both methods are blocking (LLMService runs them on its dispatcher
+    pool): `generate` returns the whole response, `stream` yields it in
+    chunks as they are produced.
+    """
+
+    name: str = "base"
+    model_name: str = ""
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        yield self.generate(prompt)
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini via google.generativeai"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash"):
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found in environment variables")
+
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+
+class FakeRateLimitError(Exception):
+    """Simulated provider quota error (classified like a Gemini 429)"""
+    code = 429
+
+_FAKE_VOCABULARY = (
+    "the court held that a party must establish each element of the claim before liability attaches "
+    "under the rule the defendant owed a duty and breached it causing foreseeable harm to the plaintiff "
+    "consideration offer and acceptance form the basis of an enforceable contract between the parties "
+    "students should compare the reasoning with earlier precedent and note how the facts were applied"
+).split()
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Deterministic offline model for load tests and benchmarks.
+
+    The response depends only on the prompt. Timing follows a simple model:
+    `latency_ms` before the first chunk, then `tokens_per_second` (one word
+    counted as one token). `error_rate` makes that fraction of calls fail
+    with a simulated 429 to exercise retries and backoff.
+    """
+
+    name = "fake"
+    model_name = "fake"
+
+    def __init__(self, latency_ms: float = 400.0, tokens_per_second: float = 50.0,
+                 response_tokens: int = 300, error_rate: float = 0.0, chunk_tokens: int = 8, seed: int = 0):
+        self.latency = latency_ms / 1000.0
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.chunk_tokens = chunk_tokens
+        self._errors = random.Random(seed)
+        self._errors_lock = threading.Lock()
+
+    def _should_fail(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._errors_lock:
+            return self._errors.random() < self.error_rate
+
+    def _response(self, prompt: str) -> str:
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        if '"issue"' in prompt and "JSON" in prompt:
+            # Shaped like the IRAC analysis LLMService.analyze_legal_case asks for
+            sentence = lambda n: " ".join(rng.choice(_FAKE_VOCABULARY) for _ in range(n)).capitalize() + "."
+            return json.dumps({
+                "issue": sentence(14),
+                "rule": sentence(18),
+                "application": sentence(30),
+                "conclusion": sentence(12),
+                "key_facts": [sentence(10) for _ in range(3)],
+                "legal_principles": [sentence(8) for _ in range(2)]
+            })
+        words = [rng.choice(_FAKE_VOCABULARY) for _ in range(self.response_tokens)]
+        lines = ["## Overview"]
+        for start in range(0, len(words), 20):
+            lines.append("- " + " ".join(words[start:start + 20]).capitalize() + ".")
+        return "\n".join(lines)
+
+    def _chunks(self, text: str) -> Iterator[str]:
+        words = text.split(" ")
+        for start in range(0, len(words), self.chunk_tokens):
+            piece = " ".join(words[start:start + self.chunk_tokens])
+            yield piece if start + self.chunk_tokens >= len(words) else piece + " "
+
+    def generate(self, prompt: str) -> str:
+        return "".join(self.stream(prompt))
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        time.sleep(self.latency)
+        if self._should_fail():
+            raise FakeRateLimitError("429 RESOURCE_EXHAUSTED (simulated by the fake LLM backend)")
+        for chunk in self._chunks(self._response(prompt)):
+            if self.tokens_per_second > 0:
+                time.sleep(len(chunk.split()) / self.tokens_per_second)
+            yield chunk
+
+def recording_key(model_name: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+class RecordReplayBackend(LLMBackend):
+    """
+    Records prompt -> response pairs from a real backend to a JSONL file,
+    or replays them without network.
+
+    In "record" mode every call goes to `inner` and is appended to `path`
+    with its first-chunk and total latency. In "replay" mode responses come
+    from the file (a missing prompt raises KeyError); with `replay_timing`
+    the recorded latencies are reproduced so load tests see realistic timing.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", inner: Optional[LLMBackend] = None,
+                 replay_timing: bool = True, model_name: Optional[str] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("Record mode needs a backend to record from")
+        self.name = mode
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.replay_timing = replay_timing
+        self.model_name = inner.model_name if inner is not None else (model_name or "")
+        self._lock = threading.Lock()
+        self.recordings: Dict[str, Dict[str, Any]] = self._load()
+        logger.info(f"LLM {mode} backend: {len(self.recordings)} recordings in {path}")
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        recordings = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        recordings[entry["key"]] = entry
+        return recordings
+
+    def _key(self, prompt: str) -> str:
+        return recording_key(self.model_name, prompt)
+
+    def _record(self, prompt: str, chunks, first_chunk_seconds: float, total_seconds: float):
+        entry = {
+            "key": self._key(prompt),
+            "model": self.model_name,
+            "prompt": prompt,
+            "chunks": chunks,
+            "first_chunk_ms": round(first_chunk_seconds * 1000, 1),
+            "total_ms": round(total_seconds * 1000, 1)
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.recordings[entry["key"]] = entry
+
+    def _replay(self, prompt: str) -> Iterator[str]:
+        entry = self.recordings.get(self._key(prompt))
+        if entry is None:
+            raise KeyError(f"No recorded response for this prompt in {self.path}")
+        chunks = entry["chunks"]
+        if not self.replay_timing:
+            yield from chunks
+            return
+        time.sleep(entry["first_chunk_ms"] / 1000.0)
+        # Spread the rest of the recorded duration evenly over the remaining chunks
+        gap = max(0.0, entry["total_ms"] - entry["first_chunk_ms"]) / 1000.0 / max(1, len(chunks) - 1)
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(gap)
+            yield chunk
+
+    def generate(self, prompt: str) -> str:
+        return "".join(self.stream(prompt))
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        if self.mode == "replay":
+            yield from self._replay(prompt)
+            return
+        started = time.perf_counter()
+        first_chunk = None
+        chunks = []
+        for chunk in self.inner.stream(prompt):
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - started
+            chunks.append(chunk)
+            yield chunk
+        total = time.perf_counter() - started
+        self._record(prompt, chunks, first_chunk if first_chunk is not None else total, total)
+
+def create_llm_backend(backend: Optional[str] = None) -> LLMBackend:
+    """Build the LLM backend selected by settings.llm_backend (or `backend`)"""
+    from app.core.config import settings
+
+    backend = backend or settings.llm_backend
+    if backend == "gemini":
+        return GeminiBackend(settings.google_api_key, settings.llm_model_name)
+    if backend == "fake":
+        return FakeLLMBackend(latency_ms=settings.llm_fake_latency_ms,
+                              tokens_per_second=settings.llm_fake_tokens_per_second,
+                              response_tokens=settings.llm_fake_response_tokens,
+                              error_rate=settings.llm_fake_error_rate)
+    if backend == "record":
+        return RecordReplayBackend(settings.llm_recording_path, mode="record",
+                                   inner=GeminiBackend(settings.google_api_key, settings.llm_model_name))
+    if backend == "replay":
+        return RecordReplayBackend(settings.llm_recording_path, mode="replay",
+                                   replay_timing=settings.llm_replay_timing, model_name=settings.llm_model_name)
+    raise ValueError(f"Unknown LLM backend: {backend} (expected one of {', '.join(LLM_BACKENDS)})")
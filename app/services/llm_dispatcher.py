@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Gemini surfaces quota errors as google.api_core ResourceExhausted (HTTP 429, gRPC RESOURCE_EXHAUSTED)
+_RATE_LIMIT_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+_TRANSIENT_ERRORS = {"ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout"}
+
+class LLMServiceError(Exception):
+    """The LLM call failed (after any retries)"""
+
+class LLMRateLimitError(LLMServiceError):
+    """The LLM provider kept rejecting calls for quota/rate reasons"""
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # google.api_core errors carry `code`; HTTP client errors usually `status_code`
+    code = getattr(error, "code", None)
+    if code is None:
+        code = getattr(error, "status_code", None)
+    return code if isinstance(code, int) else None
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    # Classified by type or status only: the message can quote prompts, ids or counts that contain "429"
+    return type(error).__name__ in _RATE_LIMIT_ERRORS or _status_code(error) == 429
+
+def is_retryable_error(error: BaseException) -> bool:
+    return (is_rate_limit_error(error) or type(error).__name__ in _TRANSIENT_ERRORS
+            or _status_code(error) in (500, 503, 504))
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket whose refill rate backs off on throttling.
+
+    A 429 halves the rate (down to `min_rate`), at most once per
+    `cooldown` seconds so a burst of concurrent rejections counts as one
+    signal; each success adds back `recovery` of `max_rate`.
+    """
+
+    def __init__(self, rate: float, burst: int, min_rate: float = 0.1, recovery: float = 0.05,
+                 cooldown: float = 1.0):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.recovery = recovery
+        self.cooldown = cooldown
+        self.last_backoff = 0.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.throttled = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_throttle(self):
+        self.throttled += 1
+        now = time.monotonic()
+        if now - self.last_backoff < self.cooldown:
+            return
+        self.last_backoff = now
+        self.rate = max(self.min_rate, self.rate / 2)
+        # Drop any saved-up burst so the lower rate takes effect immediately
+        self.tokens = min(self.tokens, 0.0)
+        logger.warning(f"LLM rate limited; backing off to {self.rate:.2f} requests/s")
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery)
+
+class LLMDispatcher:
+    """
+    Runs blocking LLM SDK calls on a dedicated, bounded thread pool.
+
+    Calls queue on an asyncio semaphore (so waiting requests hold no
+    thread), pass an adaptive token bucket, and retry retryable failures
+    with full-jitter exponential backoff. Queue depth and wait times are
+    reported by get_stats().
+    """
+
+    def __init__(self, max_concurrency: int = 8, rate_per_second: float = 0.0, burst: int = 10,
+                 max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self.bucket = AdaptiveTokenBucket(rate_per_second, burst) if rate_per_second > 0 else None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.queued = 0
+        self.max_queued = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.acquisitions = 0
+        self.retries = 0
+        self.failures = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the serving event loop, not the one (if any) at import time
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def acquire(self):
+        """
+        Take one of the bounded concurrency slots (rate limited), recording
+        queue wait. Pair with release(); prefer slot() unless the slot has to
+        outlive the coroutine that took it.
+        """
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        started = time.perf_counter()
+        try:
+            await self._get_semaphore().acquire()
+        finally:
+            self.queued -= 1
+        try:
+            if self.bucket is not None:
+                await self.bucket.acquire()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        waited = time.perf_counter() - started
+        self.acquisitions += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.in_flight += 1
+
+    def release(self):
+        """Give back a slot taken with acquire(); call on the event loop thread"""
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the bounded concurrency slots for the duration of the block"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record_outcome(self, error: Optional[BaseException] = None):
+        """Feed a call's outcome to the rate limiter"""
+        if self.bucket is None:
+            return
+        if error is None:
+            self.bucket.on_success()
+        elif is_rate_limit_error(error):
+            self.bucket.on_throttle()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Call fn(*args) on the LLM pool, retrying transient and quota errors"""
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.slot():
+                    result = await loop.run_in_executor(self.executor, fn, *args)
+                self.record_outcome()
+                return result
+            except Exception as e:
+                self.record_outcome(e)
+                if not is_retryable_error(e) or attempt == self.max_retries:
+                    self.failures += 1
+                    error_type = LLMRateLimitError if is_rate_limit_error(e) else LLMServiceError
+                    raise error_type(str(e)) from e
+                delay = self._backoff(attempt)
+                self.retries += 1
+                logger.warning(f"LLM call failed ({type(e).__name__}: {e}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                # Back off outside the slot so a sleeping retry doesn't hold a concurrency slot
+                await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "max_queue_depth": self.max_queued,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "avg_wait_ms": round(self.total_wait_seconds / self.acquisitions * 1000, 2) if self.acquisitions else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            "rate_limit": {
+                "rate_per_second": round(self.bucket.rate, 3),
+                "max_rate_per_second": self.bucket.max_rate,
+                "throttled": self.bucket.throttled
+            } if self.bucket is not None else None,
+        }
@@ -1,34 +1,114 @@
-import google.generativeai as genai
 from app.core.config import settings
-from typing import List, Dict, Any
+from app.services.llm_backends import LLMBackend, create_llm_backend
+from app.services.llm_dispatcher import LLMDispatcher, LLMServiceError
+from app.services.response_cache import ResponseCache
+from app.services.single_flight import SingleFlight
+from typing import List, Dict, Any, AsyncIterator, Optional
 import json
 import asyncio
+import threading
+
+_STREAM_DONE = object()
 
 class LLMService:
-    def __init__(self):
-        if not settings.google_api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables")
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        # Gemini by default; LLM_BACKEND=fake/replay runs the pipelines offline
+        self.backend = backend or create_llm_backend()
+        
+        self.response_cache = None
+        if settings.response_cache_enabled:
+            self.response_cache = ResponseCache(
+                max_entries=settings.response_cache_max_entries,
+                max_bytes=int(settings.response_cache_max_mb * 1024 * 1024),
+                ttl_seconds=settings.response_cache_ttl_seconds or None,
+                semantic_threshold=settings.response_cache_semantic_threshold or None,
+                semantic_max_entries=settings.response_cache_semantic_max_entries,
+                persistent=settings.response_cache_persistent
+            )
         
-        genai.configure(api_key=settings.google_api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.dispatcher = LLMDispatcher(
+            max_concurrency=settings.llm_max_concurrency,
+            rate_per_second=settings.llm_rate_limit_per_second,
+            burst=settings.llm_rate_limit_burst,
+            max_retries=settings.llm_max_retries,
+            base_delay=settings.llm_retry_base_delay_seconds,
+            max_delay=settings.llm_retry_max_delay_seconds
+        )
+        
+        # Identical prompts in flight at the same time share one Gemini call
+        self._single_flight = SingleFlight() if settings.llm_single_flight_enabled else None
+    
+    async def _call_model(self, prompt: str) -> str:
+        # Run the blocking backend call on the bounded LLM pool (rate limited, with retries)
+        return await self.dispatcher.run(self.backend.generate, prompt)
+    
+    async def _generate(self, prompt: str) -> str:
+        if self._single_flight is None:
+            return await self._call_model(prompt)
+        return await self._single_flight.do(prompt, lambda: self._call_model(prompt))
     
     async def generate_response(self, prompt: str, context: str = "") -> str:
+        """Generate a response; raises LLMServiceError (LLMRateLimitError for quota) once retries are spent"""
+        full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        return await self._generate(full_prompt)
+    
+    async def stream_response(self, prompt: str, context: str = "") -> AsyncIterator[str]:
+        """
+        Yield the response text chunk by chunk as the backend produces it.
+
+        The blocking streaming iterator runs on the LLM pool and hands chunks
+        to the event loop through a queue. It holds a dispatcher slot that is
+        released when the pool thread returns, not when the consumer leaves,
+        so a cancelled stream keeps counting until the thread is free again.
+        Streams are not retried; failures are raised as LLMServiceError.
+        """
+        full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        
+        def produce():
+            try:
+                for text in self.backend.stream(full_prompt):
+                    if cancelled.is_set():
+                        break
+                    if text:
+                        loop.call_soon_threadsafe(queue.put_nowait, text)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, _STREAM_DONE)
+        
+        await self.dispatcher.acquire()
         try:
-            full_prompt = f"{context}\n\n{prompt}" if context else prompt
-            
-            # Run the synchronous generate_content in a thread pool
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None, 
-                self.model.generate_content, 
-                full_prompt
-            )
-            
-            return response.text
-        except Exception as e:
-            return f"Error generating response: {str(e)}"
+            producer = loop.run_in_executor(self.dispatcher.executor, produce)
+        except BaseException:
+            self.dispatcher.release()
+            raise
+        # Released from the producer's completion, which a cancelled consumer can't cut short
+        producer.add_done_callback(lambda _: self.dispatcher.release())
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_DONE:
+                    break
+                if isinstance(item, Exception):
+                    self.dispatcher.record_outcome(item)
+                    raise LLMServiceError(str(item)) from item
+                yield item
+            self.dispatcher.record_outcome()
+        finally:
+            # Stop pulling from the backend if the consumer went away (e.g. client disconnected)
+            cancelled.set()
     
-    async def analyze_legal_case(self, case_text: str) -> Dict[str, Any]:
+    async def analyze_legal_case(self, case_text: str, strict: bool = False) -> Dict[str, Any]:
+        """
+        IRAC analysis of a case as a dict.
+
+        By default failures come back as placeholder analyses; with `strict`
+        they raise instead (LLMServiceError, or ValueError for a reply that
+        isn't valid JSON) so callers can report them per item.
+        """
         prompt = f"""
         Analyze the following legal case using the IRAC method (Issue, Rule, Application, Conclusion).
         Also extract key facts and legal principles.
@@ -59,7 +139,9 @@ class LLMService:
                 response_clean = response_clean[3:-3]
             
             return json.loads(response_clean)
-        except json.JSONDecodeError:
+        except json.JSONDecodeError as e:
+            if strict:
+                raise ValueError(f"LLM returned invalid JSON: {e}") from e
             return {
                 "issue": "Unable to identify issue - JSON parsing error",
                 "rule": "Unable to identify rule - JSON parsing error",
@@ -69,6 +151,8 @@ class LLMService:
                 "legal_principles": ["Error parsing response"]
             }
         except Exception as e:
+            if strict:
+                raise
             return {
                 "issue": f"Error: {str(e)}",
                 "rule": "Unable to identify rule",
@@ -78,11 +162,16 @@ class LLMService:
                 "legal_principles": []
             }
     
-    async def generate_legal_explanation(self, topic: str, question: str, context: List[str] = []) -> str:
+    def _legal_explanation_prompt(self, topic: str, question: str, context: List[str],
+                                  history: Optional[str] = None) -> str:
         context_str = "\n\n".join(context) if context else ""
-        prompt = f"""
+        history_str = f"""
+        Conversation so far (answer the new question in light of it):
+        {history}
+        """ if history else ""
+        return f"""
         You are a legal education AI assistant. Provide a clear, educational explanation about {topic}.
-        
+        {history_str}
         Question: {question}
         
         Relevant case law and context:
@@ -92,7 +181,95 @@ class LLMService:
         Include relevant legal principles, examples, and practical applications.
         Structure your response with clear headings and bullet points where appropriate.
         """
+    
+    async def generate_legal_explanation(self, topic: str, question: str, context: List[str] = [],
+                                         case_ids: Optional[List[str]] = None,
+                                         question_embedding: Optional[List[float]] = None,
+                                         history: Optional[str] = None) -> str:
+        """
+        Explain a legal question, answering from the response cache when possible.
+
+        `case_ids` (the retrieved cases) are part of the exact cache key;
+        `question_embedding` enables the semantic layer. Follow-ups with
+        conversation `history` depend on it, so they bypass the cache.
+        Failures raise LLMServiceError and are never cached.
+        """
+        use_cache = self.response_cache is not None and not history
+        if use_cache:
+            cached = await self.response_cache.get(topic, question, case_ids, question_embedding)
+            if cached is not None:
+                return cached
         
+        response = await self.generate_response(self._legal_explanation_prompt(topic, question, context, history))
+        if use_cache:
+            await self.response_cache.set(topic, question, response, case_ids, question_embedding)
+        return response
+    
+    async def stream_legal_explanation(self, topic: str, question: str, context: List[str] = [],
+                                       case_ids: Optional[List[str]] = None,
+                                       question_embedding: Optional[List[float]] = None,
+                                       history: Optional[str] = None) -> AsyncIterator[str]:
+        """Streaming variant of generate_legal_explanation (a cache hit arrives as one chunk)"""
+        use_cache = self.response_cache is not None and not history
+        if use_cache:
+            cached = await self.response_cache.get(topic, question, case_ids, question_embedding)
+            if cached is not None:
+                yield cached
+                return
+        
+        chunks = []
+        async for text in self.stream_response(self._legal_explanation_prompt(topic, question, context, history)):
+            chunks.append(text)
+            yield text
+        if use_cache and chunks:
+            await self.response_cache.set(topic, question, "".join(chunks), case_ids, question_embedding)
+    
+    async def summarize_conversation(self, summary: str, messages: List[Dict[str, Any]], max_tokens: int = 300) -> str:
+        """Fold `messages` into the running `summary` of a tutoring conversation"""
+        transcript = "\n".join(
+            f"{'Student' if message['role'] == 'user' else 'Tutor'}: {message['content']}" for message in messages
+        )
+        prompt = f"""
+        You maintain a running summary of a legal tutoring conversation.
+        
+        Current summary:
+        {summary or "(none yet)"}
+        
+        New exchanges to fold in:
+        {transcript}
+        
+        Rewrite the summary to cover everything above in at most {max_tokens * 3 // 4} words.
+        Keep the topics covered, cases and rules discussed, and what the student is still unsure about.
+        Respond with the summary text only.
+        """
         return await self.generate_response(prompt)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "model": self.backend.model_name,
+            "dispatcher": self.dispatcher.get_stats(),
+            "response_cache": self.response_cache.get_stats() if self.response_cache is not None else None,
+            "single_flight": self._single_flight.get_stats() if self._single_flight is not None else None
+        }
+
+_llm_service: Optional[LLMService] = None
+_llm_service_lock = threading.Lock()
+
+def get_llm_service() -> LLMService:
+    """Return the shared LLMService, constructing it on first use"""
+    global _llm_service
+    if _llm_service is None:
+        with _llm_service_lock:
+            if _llm_service is None:
+                _llm_service = LLMService()
+    return _llm_service
+
+def is_llm_service_loaded() -> bool:
+    return _llm_service is not None
 
-llm_service = LLMService()
\ No newline at end of file
+async def aget_llm_service() -> LLMService:
+    """Async accessor; construction (if still pending) happens off the event loop"""
+    if _llm_service is not None:
+        return _llm_service
+    return await asyncio.to_thread(get_llm_service)
\ No newline at end of file
@@ -1,89 +1,783 @@
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from sentence_transformers import SentenceTransformer
 from app.core.config import settings
-from typing import List, Dict, Any
+from app.services.context_packer import ContextPacker
+from app.services.corpus_manifest import (LEGACY_CASE_ID, CorpusManifest, default_manifest_path, embedding_signature,
+                                         scan_corpus, stable_case_id)
+from app.services.embedders import create_embedder
+from app.services.embedding_batcher import MicroBatcher
+from app.services.lexical_index import BM25Index, PARTITION_FIELDS, reciprocal_rank_fusion
+from app.services.vector_store import NumpyVectorStore, VECTOR_STORES
+from app.utils.cache import LRUCache
+from app.utils.case_loader import iter_cases
+from app.utils.text_processing import split_into_passages
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Optional, Callable
+import asyncio
 import json
-import os
+import logging
+import numpy as np
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+# Case fields that are split into passages for the passage index
+PASSAGE_FIELDS = ("facts", "holding", "reasoning")
+
+def build_case_text(case: Dict[str, Any]) -> str:
+    """Concatenate the searchable fields of a case into a single document"""
+    return f"{case.get('case_name', '')} {case.get('facts', '')} {case.get('holding', '')} {case.get('reasoning', '')}"
+
+def build_case_metadata(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a case into Chroma-compatible metadata (str/int/float/bool values only)"""
+    metadata = {}
+    for key, value in case.items():
+        if value is None:
+            continue
+        if isinstance(value, (str, int, float, bool)):
+            metadata[key] = value
+        elif isinstance(value, list) and all(isinstance(item, str) for item in value):
+            metadata[key] = "; ".join(value)
+        else:
+            metadata[key] = json.dumps(value)
+    return metadata
+
+def build_case_passages(case_id: str, case: Dict[str, Any]) -> List[tuple]:
+    """
+    Split a case's long-form fields into overlapping passages.
+
+    Returns (passage_id, text, metadata) tuples; metadata points back to the
+    parent case and carries its filterable fields (area, court, year).
+    """
+    passages = []
+    for field in PASSAGE_FIELDS:
+        chunks = split_into_passages(str(case.get(field) or ''), settings.passage_max_words,
+                                     settings.passage_overlap_words)
+        for chunk in chunks:
+            metadata = {
+                "case_id": case_id,
+                "case_name": case.get('case_name', ''),
+                "field": field,
+                "passage_index": len(passages)
+            }
+            for key in PARTITION_FIELDS:
+                if case.get(key) is not None:
+                    metadata[key] = case[key]
+            passages.append((f"{case_id}::p{len(passages)}", chunk, metadata))
+    return passages
+
+def normalize_query(query: str) -> str:
+    """Normalize query text for embedding cache keys (the MiniLM tokenizer is uncased)"""
+    return re.sub(r'\s+', ' ', query).strip().lower()
+
+def normalize_area(area: str) -> str:
+    """Map an area name or id ("Contract Law", "contract-law") to its area_of_law id"""
+    return re.sub(r'[\s\-]+', '_', area.strip().lower())
+
+def build_where(area: Optional[str] = None, court: Optional[str] = None,
+                year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Build a metadata filter from optional area/court/year constraints"""
+    where = {}
+    if area:
+        where["area_of_law"] = normalize_area(area)
+    if court:
+        where["court"] = court
+    if year is not None:
+        where["year"] = year
+    return where or None
+
+def _chroma_where(where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # Chroma only accepts a single field per clause; combine several with $and
+    if not where:
+        return None
+    if len(where) == 1:
+        return dict(where)
+    return {"$and": [{field: value} for field, value in where.items()]}
+
+def _distance_to_similarity(distance: float, space: str) -> float:
+    # Embeddings are unit length, so squared L2 distance is 2 - 2*cosine
+    if space == "l2":
+        return round(1.0 - distance / 2.0, 4)
+    return round(1.0 - distance, 4)  # cosine and ip
+
+def _embedding_cache_sizeof(key: str, value: np.ndarray) -> int:
+    # Vector bytes plus the key and a rough per-entry bookkeeping overhead
+    return value.nbytes + len(key) + 128
 
 class RAGService:
     def __init__(self):
-        # Use persistent ChromaDB
-        self.client = chromadb.PersistentClient(
-            path=settings.chroma_persist_directory,
-            settings=ChromaSettings(anonymized_telemetry=False)
-        )
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        if settings.vector_store not in VECTOR_STORES:
+            raise ValueError(f"Unknown vector store: {settings.vector_store} (expected one of {', '.join(VECTOR_STORES)})")
+        
+        self.startup_timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        self.model = create_embedder(settings.embedding_backend)
+        self.startup_timings["embedding_model"] = round(time.perf_counter() - started, 3)
+        
+        self.client = None
+        if settings.vector_store == "chroma":
+            # Heavy imports (torch, chromadb) happen here rather than at module import time
+            import chromadb
+            from chromadb.config import Settings as ChromaSettings
+            
+            # Use persistent ChromaDB
+            self.client = chromadb.PersistentClient(
+                path=settings.chroma_persist_directory,
+                settings=ChromaSettings(anonymized_telemetry=False)
+            )
         self.collection = None
+        self.passages = None
+        # Dedicated pool for encode/query work so async callers never block the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.rag_worker_threads,
+            thread_name_prefix="rag-worker"
+        )
+        self._query_batcher = MicroBatcher(
+            self._encode_uncached,
+            self._executor,
+            max_batch_size=settings.query_batch_max_size,
+            max_wait_ms=settings.query_batch_wait_ms
+        )
+        self._query_cache = LRUCache(
+            max_entries=settings.query_cache_max_entries,
+            max_bytes=int(settings.query_cache_max_mb * 1024 * 1024),
+            ttl_seconds=settings.query_cache_ttl_seconds or None,
+            sizeof=_embedding_cache_sizeof
+        )
+        self.lexical_index = BM25Index()
+        self._context_packer = ContextPacker(
+            token_budget=settings.context_token_budget,
+            max_cases=settings.context_cases,
+            max_sentences=settings.context_max_sentences,
+            dedupe_threshold=settings.context_dedupe_threshold
+        )
+        self._context_stats = {"requests": 0, "tokens_total": 0, "tokens_max": 0}
+        started = time.perf_counter()
         self._initialize_collection()
+        self.startup_timings["vector_index"] = round(time.perf_counter() - started, 3)
     
-    def _initialize_collection(self):
+    def warm_up(self):
+        """Run one forward pass so the first real query doesn't pay for lazy initialisation"""
+        self.model.encode(["warm up"])
+    
+    def _open_collection(self, name: str) -> tuple:
+        """Open (or create) a collection in the configured vector store; returns (collection, created)"""
+        if settings.vector_store == "numpy":
+            store = NumpyVectorStore(settings.numpy_store_directory, name, dtype=settings.numpy_store_dtype)
+            return store, not store.exists
         try:
-            self.collection = self.client.get_collection("legal_cases")
+            return self.client.get_collection(name), False
         except:
-            self.collection = self.client.create_collection("legal_cases")
+            return self.client.create_collection(name, metadata={"hnsw:space": "cosine"}), True
+    
+    def _initialize_collection(self):
+        if settings.passage_index_enabled:
+            self.passages, _ = self._open_collection("legal_passages")
+        self.collection, created = self._open_collection("legal_cases")
+        if created:
             self._load_initial_data()
+            return
+        self._build_lexical_index()
+        
+        if self.passages is not None and self.passages.count() == 0 and self.collection.count() > 0:
+            self._backfill_passages()
+        if settings.corpus_sync_on_startup:
+            # Picks up case files changed while the service was down (only new/changed cases are embedded)
+            self.sync_corpus(settings.cases_data_directory)
+    
+    def _backfill_passages(self, page_size: int = 256):
+        """Build the passage index for a case collection created before passages existed"""
+        logger.info("Building passage index for existing cases")
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            if not page['ids']:
+                break
+            self._index_passages(dict(zip(page['ids'], page['metadatas'])))
+            offset += len(page['ids'])
+        self._persist()
+        logger.info(f"Passage index built: {self.passages.count()} passages")
+    
+    def _build_lexical_index(self, page_size: int = 1000):
+        """Rebuild the BM25 index from documents already stored in the collection"""
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page['ids']:
+                break
+            self.lexical_index.add_many(zip(page['ids'], page['documents'], page['metadatas']))
+            offset += len(page['ids'])
+        logger.info(f"Lexical index built over {len(self.lexical_index)} cases")
     
     def _load_initial_data(self):
         """Load initial legal cases from data files"""
-        data_dir = "data/cases"
-        if os.path.exists(data_dir):
-            for filename in os.listdir(data_dir):
-                if filename.endswith('.json'):
-                    with open(os.path.join(data_dir, filename), 'r') as f:
-                        cases = json.load(f)
-                        for case in cases:
-                            self.add_case(case)
+        self.sync_corpus(settings.cases_data_directory)
     
-    def add_case(self, case: Dict[str, Any]):
-        """Add a legal case to the vector database"""
-        case_text = f"{case.get('case_name', '')} {case.get('facts', '')} {case.get('holding', '')} {case.get('reasoning', '')}"
-        embedding = self.model.encode([case_text])
+    def sync_corpus(self, data_dir: Optional[str] = None, batch_size: Optional[int] = None,
+                    progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Incrementally bring the index in line with the case files.
+
+        Every case is hashed and compared with the manifest: only new or
+        changed cases are re-embedded, and cases that disappeared from the
+        files are deleted, as are documents left under the old per-process
+        hash ids. Switching embedding model or backend re-embeds everything.
+        A case file that fails to parse is skipped and counted in
+        `failed_files`; its cases are left as they are.
+        """
+        data_dir = data_dir or settings.cases_data_directory
+        batch_size = batch_size or settings.ingest_batch_size
+        manifest = CorpusManifest.load(default_manifest_path())
+        signature = embedding_signature(settings.embedding_model_name, self.model.name)
+        rebuild = manifest.needs_rebuild(signature)
+        stats = {"new": 0, "changed": 0, "unchanged": 0, "removed": 0, "added": 0, "failed": 0,
+                 "failed_files": 0, "batches": 0, "elapsed_seconds": 0.0, "cases_per_second": 0.0}
+        failed_files: Dict[str, str] = {}
+        started = time.perf_counter()
+        
+        seen = set()
+        batch, pending = [], {}
+        
+        def flush():
+            if self._add_batch(batch, stats):
+                for case_id, (content_hash, source) in pending.items():
+                    manifest.record(case_id, content_hash, source)
+            self._report_progress(stats, started, progress)
+            batch.clear()
+            pending.clear()
+        
+        for case_id, content_hash, source, case in scan_corpus(data_dir, failed_files):
+            seen.add(case_id)
+            if not rebuild and manifest.is_current(case_id, content_hash):
+                stats["unchanged"] += 1
+                continue
+            stats["changed" if case_id in manifest.entries else "new"] += 1
+            batch.append({**case, "id": case_id})
+            pending[case_id] = (content_hash, source)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        
+        removed = manifest.removed_ids(seen, failed_files)
+        removed += [case_id for case_id in self._indexed_ids()
+                    if LEGACY_CASE_ID.match(case_id) and case_id not in seen and case_id not in manifest.entries]
+        if removed:
+            self.delete_cases(removed)
+            for case_id in removed:
+                manifest.remove(case_id)
+        stats["removed"] = len(removed)
+        stats["failed_files"] = len(failed_files)
+        
+        self._persist()
+        manifest.embedding_model = signature
+        manifest.save()
+        stats["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(f"Corpus sync finished: {stats['new']} new, {stats['changed']} changed, "
+                    f"{stats['unchanged']} unchanged, {stats['removed']} removed in {stats['elapsed_seconds']}s")
+        return stats
+    
+    def _indexed_ids(self, page_size: int = 5000) -> List[str]:
+        ids, offset = [], 0
+        while True:
+            page = self.collection.get(include=[], limit=page_size, offset=offset)
+            if not page['ids']:
+                return ids
+            ids.extend(page['ids'])
+            offset += len(page['ids'])
+    
+    def delete_cases(self, case_ids: List[str]):
+        """Remove cases (and their passages) from every index"""
+        for start in range(0, len(case_ids), settings.ingest_batch_size):
+            chunk = case_ids[start:start + settings.ingest_batch_size]
+            self.collection.delete(ids=chunk)
+            if self.passages is not None:
+                self.passages.delete(where={"case_id": {"$in": chunk}})
+            for case_id in chunk:
+                self.lexical_index.remove(case_id)
+        self._persist()
+    
+    def _persist(self):
+        """Flush buffered writes of file-backed stores (Chroma persists on every write)"""
+        for store in (self.collection, self.passages):
+            if isinstance(store, NumpyVectorStore):
+                store.persist()
+    
+    def ingest_directory(self, data_dir: str, batch_size: Optional[int] = None,
+                         progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Stream every JSON/JSONL case file in a directory into the collection"""
+        logger.info(f"Ingesting cases from {data_dir}")
+        return self.add_cases(iter_cases(data_dir), batch_size=batch_size, progress=progress)
+    
+    def add_cases(self, cases: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                  progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Add legal cases to the vector database in batches.
+
+        Cases are consumed lazily from the iterable, encoded `batch_size` at a
+        time and written with a single upsert per batch. Returns ingestion
+        stats (cases added, failures, elapsed seconds, cases/sec).
+        """
+        batch_size = batch_size or settings.ingest_batch_size
+        stats = {"added": 0, "failed": 0, "batches": 0, "elapsed_seconds": 0.0, "cases_per_second": 0.0}
+        started = time.perf_counter()
+        
+        batch = []
+        for case in cases:
+            batch.append(case)
+            if len(batch) >= batch_size:
+                self._add_batch(batch, stats)
+                self._report_progress(stats, started, progress)
+                batch = []
+        if batch:
+            self._add_batch(batch, stats)
+            self._report_progress(stats, started, progress)
+        self._persist()
+        
+        logger.info(f"Ingestion finished: {stats['added']} cases in {stats['elapsed_seconds']}s "
+                    f"({stats['cases_per_second']} cases/sec, {stats['failed']} failed)")
+        return stats
+    
+    def _add_batch(self, batch: List[Dict[str, Any]], stats: Dict[str, Any]) -> bool:
+        """Encode and upsert one batch of cases; returns False if the batch failed"""
+        # Later duplicates of an id within a batch win, as they would with sequential upserts
+        by_id = {}
+        for case in batch:
+            by_id[stable_case_id(case)] = (case, build_case_text(case))
+        ids = list(by_id.keys())
+        documents = [case_text for _, case_text in by_id.values()]
+        metadatas = [build_case_metadata(case) for case, _ in by_id.values()]
         
         try:
-            self.collection.add(
-                embeddings=embedding.tolist(),
-                documents=[case_text],
-                metadatas=[case],
-                ids=[case.get('id', str(hash(case_text)))]
+            embeddings = self.model.encode(documents, batch_size=settings.embedding_batch_size)
+            self.collection.upsert(
+                embeddings=embeddings.tolist(),
+                documents=documents,
+                metadatas=metadatas,
+                ids=ids
             )
+            self.lexical_index.add_many(zip(ids, documents, metadatas))
+            if self.passages is not None:
+                self._index_passages({case_id: case for case_id, (case, _) in by_id.items()})
+            stats["added"] += len(ids)
+            return True
         except Exception as e:
-            print(f"Error adding case: {e}")
+            logger.error(f"Error adding batch of {len(ids)} cases: {e}")
+            stats["failed"] += len(ids)
+            return False
+        finally:
+            stats["batches"] += 1
     
-    def search_similar_cases(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar legal cases"""
-        try:
-            query_embedding = self.model.encode([query])
-            
-            results = self.collection.query(
-                query_embeddings=query_embedding.tolist(),
-                n_results=n_results
-            )
-            
-            return [
+    def _index_passages(self, cases_by_id: Dict[str, Dict[str, Any]]):
+        """Replace the passages of the given cases with freshly chunked and encoded ones"""
+        passages = []
+        for case_id, case in cases_by_id.items():
+            passages.extend(build_case_passages(case_id, case))
+        
+        # Drop passages from previous versions (a case may now have fewer chunks)
+        self.passages.delete(where={"case_id": {"$in": list(cases_by_id.keys())}})
+        if not passages:
+            return
+        
+        # The case name gives each passage its context when embedded on its own
+        texts = [f"{metadata['case_name']}: {text}" for _, text, metadata in passages]
+        embeddings = self.model.encode(texts, batch_size=settings.embedding_batch_size)
+        self.passages.upsert(
+            ids=[passage_id for passage_id, _, _ in passages],
+            embeddings=embeddings.tolist(),
+            documents=[text for _, text, _ in passages],
+            metadatas=[metadata for _, _, metadata in passages]
+        )
+    
+    def _report_progress(self, stats: Dict[str, Any], started: float,
+                         progress: Optional[Callable[[Dict[str, Any]], None]]):
+        elapsed = time.perf_counter() - started
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["cases_per_second"] = round(stats["added"] / elapsed, 1) if elapsed > 0 else 0.0
+        logger.info(f"Ingested {stats['added']} cases ({stats['cases_per_second']} cases/sec)")
+        if progress:
+            progress(dict(stats))
+    
+    def add_case(self, case: Dict[str, Any]):
+        """Add a legal case to the vector database"""
+        self.add_cases([case])
+    
+    def encode_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Encode a batch of query strings, reusing cached embeddings.
+
+        Only queries missing from the embedding cache are sent through the
+        model, in a single forward pass.
+        """
+        keys = [normalize_query(query) for query in queries]
+        embeddings = [self._query_cache.get(key) for key in keys]
+        
+        missing = [key for key, embedding in zip(keys, embeddings) if embedding is None]
+        if missing:
+            fresh = dict(zip(missing, self._encode_uncached(missing)))
+            embeddings = [fresh[key] if embedding is None else embedding
+                          for key, embedding in zip(keys, embeddings)]
+        
+        return [embedding.tolist() for embedding in embeddings]
+    
+    def _encode_uncached(self, queries: List[str]) -> List[np.ndarray]:
+        """Run the model over queries (deduplicated) and store results in the cache"""
+        keys = [normalize_query(query) for query in queries]
+        unique_keys = list(dict.fromkeys(keys))
+        encoded = np.asarray(
+            self.model.encode(unique_keys, batch_size=settings.embedding_batch_size),
+            dtype=np.float32
+        )
+        fresh = dict(zip(unique_keys, encoded))
+        for key, embedding in fresh.items():
+            self._query_cache.set(key, embedding)
+        return [fresh[key] for key in keys]
+    
+    async def aencode_query(self, query: str) -> List[float]:
+        """Encode one query, answering from the cache or joining the next micro-batch"""
+        cached = self._query_cache.get(normalize_query(query))
+        if cached is not None:
+            return cached.tolist()
+        embedding = await self._query_batcher.submit(query)
+        return embedding.tolist()
+    
+    def _query_by_embeddings(self, query_embeddings: List[List[float]], n_results: int,
+                             where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Vector search for several query embeddings in one index call; one result list per query"""
+        if where:
+            # Never ask the index for more neighbours than the filter can match
+            n_results = min(n_results, len(self.lexical_index.filter_ids(where)))
+        if n_results == 0 or not query_embeddings:
+            return [[] for _ in query_embeddings]
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=_chroma_where(where),
+            include=["documents", "metadatas", "distances"]
+        )
+        
+        space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        return [
+            [
                 {
+                    "id": case_id,
                     "case": metadata,
-                    "similarity": 1.0,  # ChromaDB doesn't return similarity scores directly
+                    "similarity": _distance_to_similarity(distance, space),
                     "text": document
                 }
-                for metadata, document in zip(results['metadatas'][0], results['documents'][0])
+                for case_id, metadata, document, distance in zip(ids, metadatas, documents, distances)
             ]
+            for ids, metadatas, documents, distances in zip(
+                results['ids'], results['metadatas'], results['documents'], results['distances']
+            )
+        ]
+    
+    def _query_by_embedding(self, query_embedding: List[float], n_results: int,
+                            where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self._query_by_embeddings([query_embedding], n_results, where)[0]
+    
+    def _search_lexical(self, query: str, n_results: int,
+                        where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        results = []
+        for case_id, score in self.lexical_index.search(query, n_results, where=where):
+            metadata, document = self.lexical_index.get_document(case_id)
+            results.append({
+                "id": case_id,
+                "case": metadata,
+                "similarity": round(score, 4),
+                "text": document
+            })
+        return results
+    
+    def _search_with_embedding(self, query: str, query_embedding: List[float], n_results: int,
+                               mode: str, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        if mode == "vector":
+            return self._query_by_embedding(query_embedding, n_results, where)
+        
+        # Hybrid: fuse a deeper candidate list from each retriever with reciprocal rank fusion
+        candidates = n_results * settings.hybrid_candidate_multiplier
+        vector_results = self._query_by_embedding(query_embedding, candidates, where)
+        lexical_results = self._search_lexical(query, candidates, where)
+        
+        by_id = {result["id"]: result for result in lexical_results + vector_results}
+        fused = reciprocal_rank_fusion(
+            [[result["id"] for result in vector_results], [result["id"] for result in lexical_results]],
+            k=settings.rrf_k
+        )
+        return [
+            {**by_id[case_id], "similarity": round(score, 6)}
+            for case_id, score in fused[:n_results]
+        ]
+    
+    def search_similar_cases(self, query: str, n_results: int = 5, mode: Optional[str] = None,
+                             where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Search for similar legal cases.
+
+        `mode` selects the retriever: "vector" (MiniLM similarity), "lexical"
+        (BM25 only, no embedding) or "hybrid" (both, fused by rank).
+        `where` restricts the search to cases whose metadata matches every
+        field (see build_where).
+        """
+        mode = mode or settings.default_search_mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        try:
+            if mode == "lexical":
+                return self._search_lexical(query, n_results, where)
+            query_embedding = self.encode_queries([query])[0]
+            return self._search_with_embedding(query, query_embedding, n_results, mode, where)
         except Exception as e:
             print(f"Error searching cases: {e}")
             return []
     
+    def search_similar_cases_batch(self, queries: List[str], n_results: int = 5, mode: Optional[str] = None,
+                                   where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        search_similar_cases for many queries at once.
+
+        Queries are encoded in one forward pass; in "vector" mode they are
+        also answered by a single index query.
+        """
+        mode = mode or settings.default_search_mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        if mode == "lexical":
+            return [self._search_lexical(query, n_results, where) for query in queries]
+        query_embeddings = self.encode_queries(queries)
+        if mode == "vector":
+            return self._query_by_embeddings(query_embeddings, n_results, where)
+        return [
+            self._search_with_embedding(query, query_embedding, n_results, mode, where)
+            for query, query_embedding in zip(queries, query_embeddings)
+        ]
+    
+    async def asearch_similar_cases(self, query: str, n_results: int = 5, mode: Optional[str] = None,
+                                    where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Async variant of search_similar_cases.
+
+        The query is encoded together with other concurrent queries in one
+        micro-batch, and the vector query runs on the RAG worker pool.
+        """
+        mode = mode or settings.default_search_mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        try:
+            loop = asyncio.get_running_loop()
+            if mode == "lexical":
+                return await loop.run_in_executor(self._executor, self._search_lexical, query, n_results, where)
+            query_embedding = await self.aencode_query(query)
+            return await loop.run_in_executor(
+                self._executor,
+                self._search_with_embedding,
+                query,
+                query_embedding,
+                n_results,
+                mode,
+                where
+            )
+        except Exception as e:
+            print(f"Error searching cases: {e}")
+            return []
+    
+    def get_cases_by_metadata(self, where: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
+        """Exact metadata lookup (e.g. all cases in an area of law); no embedding involved"""
+        results = self.collection.get(
+            where=_chroma_where(where),
+            limit=limit,
+            include=["documents", "metadatas"]
+        )
+        return [
+            {
+                "id": case_id,
+                "case": metadata,
+                "similarity": 1.0,
+                "text": document
+            }
+            for case_id, metadata, document in zip(results['ids'], results['metadatas'], results['documents'])
+        ]
+    
+    async def aget_cases_by_metadata(self, where: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
+        """Async variant of get_cases_by_metadata"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.get_cases_by_metadata, where, limit)
+    
+    def _query_passages(self, query_embedding: List[float], n_cases: int, passages_per_case: int,
+                        where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        # Over-fetch passages so enough distinct cases survive grouping
+        results = self.passages.query(
+            query_embeddings=[query_embedding],
+            n_results=n_cases * passages_per_case * 3,
+            where=_chroma_where(where),
+            include=["documents", "metadatas", "distances"]
+        )
+        
+        groups: Dict[str, Dict[str, Any]] = {}
+        space = (self.passages.metadata or {}).get("hnsw:space", "l2")
+        for document, metadata, distance in zip(results['documents'][0], results['metadatas'][0], results['distances'][0]):
+            case_id = metadata['case_id']
+            similarity = _distance_to_similarity(distance, space)
+            if case_id not in groups:
+                if len(groups) >= n_cases:
+                    continue
+                stored = self.lexical_index.get_document(case_id)
+                groups[case_id] = {
+                    "id": case_id,
+                    "case": stored[0] if stored else {"case_name": metadata.get('case_name', '')},
+                    "similarity": similarity,
+                    "passages": []
+                }
+            group = groups[case_id]
+            if len(group["passages"]) < passages_per_case:
+                group["passages"].append({
+                    "field": metadata['field'],
+                    "passage_index": metadata['passage_index'],
+                    "similarity": similarity,
+                    "text": document
+                })
+        return list(groups.values())
+    
+    def search_passages(self, query: str, n_cases: int = 3, passages_per_case: Optional[int] = None,
+                        where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Best-matching passages, grouped by parent case (best case first)"""
+        if self.passages is None:
+            raise RuntimeError("Passage index is disabled (PASSAGE_INDEX_ENABLED=false)")
+        query_embedding = self.encode_queries([query])[0]
+        return self._query_passages(query_embedding, n_cases, passages_per_case or settings.context_passages_per_case, where)
+    
+    async def asearch_passages(self, query: str, n_cases: int = 3, passages_per_case: Optional[int] = None,
+                               where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Async variant of search_passages"""
+        if self.passages is None:
+            raise RuntimeError("Passage index is disabled (PASSAGE_INDEX_ENABLED=false)")
+        query_embedding = await self.aencode_query(query)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self._query_passages,
+            query_embedding,
+            n_cases,
+            passages_per_case or settings.context_passages_per_case,
+            where
+        )
+    
+    def _context_search_args(self, query: str, topic: Optional[str]) -> tuple:
+        """
+        Turn a chat topic into a search filter when it names a known area of
+        law; free-form topics still just steer the query text.
+        """
+        if not topic:
+            return query, None
+        area = normalize_area(topic)
+        if self.lexical_index.has_partition("area_of_law", area):
+            return query, {"area_of_law": area}
+        return f"{topic} {query}", None
+    
+    def _pack_context(self, search_query: str, similar_cases: List[Dict[str, Any]],
+                      token_budget: Optional[int]) -> Dict[str, Any]:
+        packed = self._context_packer.pack(search_query, similar_cases, token_budget)
+        tokens = packed["stats"]["tokens_used"]
+        self._context_stats["requests"] += 1
+        self._context_stats["tokens_total"] += tokens
+        self._context_stats["tokens_max"] = max(self._context_stats["tokens_max"], tokens)
+        logger.info(f"Packed {packed['stats']['cases']} cases into {tokens}/{packed['stats']['token_budget']} context tokens")
+        return packed
+    
+    def get_packed_context(self, query: str, topic: str = None,
+                           token_budget: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Retrieve candidate cases for a query and pack them into a token budget.
+
+        Returns {"context": [block, ...], "case_ids": [...], "stats": {...}}; see ContextPacker.
+        """
+        search_query, where = self._context_search_args(query, topic)
+        if self.passages is not None:
+            try:
+                similar_cases = self.search_passages(search_query, n_cases=settings.context_candidate_cases, where=where)
+            except Exception as e:
+                print(f"Error searching passages: {e}")
+                similar_cases = []
+        else:
+            similar_cases = self.search_similar_cases(search_query, n_results=settings.context_candidate_cases, where=where)
+        return self._pack_context(search_query, similar_cases, token_budget)
+    
+    async def aget_packed_context(self, query: str, topic: str = None,
+                                  token_budget: Optional[int] = None) -> Dict[str, Any]:
+        """Async variant of get_packed_context"""
+        search_query, where = self._context_search_args(query, topic)
+        if self.passages is not None:
+            try:
+                similar_cases = await self.asearch_passages(search_query, n_cases=settings.context_candidate_cases, where=where)
+            except Exception as e:
+                print(f"Error searching passages: {e}")
+                similar_cases = []
+        else:
+            similar_cases = await self.asearch_similar_cases(search_query, n_results=settings.context_candidate_cases, where=where)
+        return self._pack_context(search_query, similar_cases, token_budget)
+    
     def get_context_for_query(self, query: str, topic: str = None) -> List[str]:
         """Get relevant context for a legal query"""
-        search_query = f"{topic} {query}" if topic else query
-        similar_cases = self.search_similar_cases(search_query, n_results=3)
-        
-        context = []
-        for case in similar_cases:
-            case_info = case['case']
-            context.append(f"Case: {case_info.get('case_name', 'Unknown')}\n"
-                         f"Facts: {case_info.get('facts', '')}\n"
-                         f"Holding: {case_info.get('holding', '')}")
-        
-        return context
+        return self.get_packed_context(query, topic)["context"]
+    
+    async def aget_context_for_query(self, query: str, topic: str = None) -> List[str]:
+        """Async variant of get_context_for_query"""
+        return (await self.aget_packed_context(query, topic))["context"]
+    
+    async def aget_stats(self) -> Dict[str, Any]:
+        """Async variant of get_stats (in-process, so no I/O; mirrors RemoteRAGService)"""
+        return self.get_stats()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Runtime statistics for the retrieval layer"""
+        return {
+            "embedding_backend": self.model.name,
+            "vector_store": settings.vector_store,
+            "vector_store_stats": self.collection.get_stats() if isinstance(self.collection, NumpyVectorStore) else None,
+            "worker_threads": settings.rag_worker_threads,
+            "query_batching": self._query_batcher.get_stats(),
+            "query_embedding_cache": self._query_cache.get_stats(),
+            "lexical_index_documents": len(self.lexical_index),
+            "passage_index_passages": self.passages.count() if self.passages is not None else None,
+            "context_packing": {
+                "token_budget": settings.context_token_budget,
+                "requests": self._context_stats["requests"],
+                "avg_tokens": round(self._context_stats["tokens_total"] / self._context_stats["requests"], 1)
+                if self._context_stats["requests"] else 0.0,
+                "max_tokens": self._context_stats["tokens_max"]
+            }
+        }
+
+_rag_service: Optional[RAGService] = None
+_rag_service_lock = threading.Lock()
+
+def get_rag_service() -> RAGService:
+    """
+    Return the shared RAGService, constructing it on first use.
+
+    With RETRIEVAL_SOCKET set this is a RemoteRAGService talking to the
+    retrieval sidecar instead (see app/services/retrieval_server.py).
+    """
+    global _rag_service
+    if _rag_service is None:
+        with _rag_service_lock:
+            if _rag_service is None:
+                if settings.retrieval_socket:
+                    from app.services.retrieval_client import RemoteRAGService
+                    _rag_service = RemoteRAGService(settings.retrieval_socket,
+                                                    settings.retrieval_connect_timeout_seconds,
+                                                    settings.retrieval_max_idle_connections)
+                else:
+                    _rag_service = RAGService()
+    return _rag_service
+
+async def aget_rag_service() -> RAGService:
+    """Async accessor; construction (if still pending) happens off the event loop"""
+    if _rag_service is not None:
+        return _rag_service
+    return await asyncio.to_thread(get_rag_service)
 
-rag_service = RAGService()
\ No newline at end of file
+def is_rag_service_loaded() -> bool:
+    return _rag_service is not None
\ No newline at end of file
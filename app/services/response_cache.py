@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core import database
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_COLLECTION = "llm_response_cache"
+
+def normalize_question(text: str) -> str:
+    """Case, whitespace and trailing punctuation insensitive form of a question or topic"""
+    return re.sub(r'\s+', ' ', text or '').strip().lower().rstrip('?!. ')
+
+def response_cache_key(topic: str, question: str, case_ids: Optional[Sequence[str]] = None) -> str:
+    """Exact-layer key: normalized topic and question plus the (order-independent) retrieved case ids"""
+    payload = json.dumps([normalize_question(topic), normalize_question(question), sorted(case_ids or [])])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _response_sizeof(key: str, value: Dict[str, Any]) -> int:
+    embedding = value.get("embedding")
+    return len(key) + len(value["response"].encode("utf-8")) + (embedding.nbytes if embedding is not None else 0) + 256
+
+class ResponseCache:
+    """
+    Two-layer cache of generated explanations.
+
+    The exact layer is keyed on (topic, question, retrieved case ids). The
+    semantic layer reuses an answer for the same topic when the new
+    question's embedding has cosine similarity >= `semantic_threshold` with
+    a cached question. Both layers are in-process LRUs with TTL and memory
+    caps. An optional MongoDB collection (TTL-indexed) backs the exact layer
+    so every instance shares answers.
+    """
+
+    def __init__(self, max_entries: int = 2000, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None, semantic_threshold: Optional[float] = 0.92,
+                 semantic_max_entries: int = 2000, persistent: bool = False):
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        self.persistent = persistent
+        self._exact = LRUCache(max_entries=max_entries, max_bytes=max_bytes,
+                               ttl_seconds=ttl_seconds, sizeof=_response_sizeof)
+        self._semantic = LRUCache(max_entries=semantic_max_entries, max_bytes=max_bytes,
+                                  ttl_seconds=ttl_seconds, sizeof=_response_sizeof)
+        # Per-topic (keys, stacked embeddings), rebuilt only after that topic gains an entry
+        self._semantic_index = LRUCache(max_entries=256)
+        self._ttl_index_ready = False
+        self.lookups = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.persistent_hits = 0
+        self.stores = 0
+
+    def _topic_index(self, topic: str) -> Tuple[List[str], Optional[np.ndarray]]:
+        index = self._semantic_index.get(topic)
+        if index is None:
+            candidates = [(key, value) for key, value in self._semantic.items() if value["topic"] == topic]
+            matrix = np.stack([value["embedding"] for _, value in candidates]) if candidates else None
+            index = ([key for key, _ in candidates], matrix)
+            self._semantic_index.set(topic, index)
+        return index
+
+    def _semantic_lookup(self, topic: str, embedding: np.ndarray) -> Optional[str]:
+        # The index can hold entries the LRU has since evicted or expired; a hit on one rebuilds it once
+        for _ in range(2):
+            keys, matrix = self._topic_index(topic)
+            if matrix is None:
+                return None
+            scores = matrix @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] < self.semantic_threshold:
+                return None
+            value = self._semantic.get(keys[best])  # also refreshes recency
+            if value is not None:
+                logger.info(f"Semantic response cache hit (similarity {scores[best]:.3f})")
+                return value["response"]
+            self._semantic_index.delete(topic)
+        return None
+
+    async def _collection(self):
+        # Resolved per call: the database may connect after this cache is created, or not at all
+        if not self.persistent or not database.is_database_connected():
+            return None
+        collection = database.db.database[RESPONSE_CACHE_COLLECTION]
+        if not self._ttl_index_ready and self.ttl_seconds:
+            await collection.create_index("created_at", expireAfterSeconds=int(self.ttl_seconds))
+            self._ttl_index_ready = True
+        return collection
+
+    async def get(self, topic: str, question: str, case_ids: Optional[Sequence[str]] = None,
+                  embedding: Optional[Sequence[float]] = None) -> Optional[str]:
+        """Cached response for this question, or None (exact, then persistent, then semantic)"""
+        self.lookups += 1
+        key = response_cache_key(topic, question, case_ids)
+        cached = self._exact.get(key)
+        if cached is not None:
+            self.exact_hits += 1
+            return cached["response"]
+
+        try:
+            collection = await self._collection()
+            if collection is not None:
+                document = await collection.find_one({"_id": key})
+                # Mongo's TTL monitor runs about once a minute; don't serve documents it hasn't reaped yet
+                if document and (not self.ttl_seconds or
+                                 document["created_at"] > datetime.utcnow() - timedelta(seconds=self.ttl_seconds)):
+                    self.persistent_hits += 1
+                    self._exact.set(key, {"response": document["response"]})
+                    return document["response"]
+        except Exception as e:
+            logger.warning(f"Persistent response cache lookup failed: {e}")
+
+        if self.semantic_threshold and embedding is not None:
+            vector = self._unit(embedding)
+            response = self._semantic_lookup(normalize_question(topic), vector)
+            if response is not None:
+                self.semantic_hits += 1
+                return response
+        return None
+
+    async def set(self, topic: str, question: str, response: str, case_ids: Optional[Sequence[str]] = None,
+                  embedding: Optional[Sequence[float]] = None):
+        key = response_cache_key(topic, question, case_ids)
+        self._exact.set(key, {"response": response})
+        if self.semantic_threshold and embedding is not None:
+            self._semantic.set(key, {"topic": normalize_question(topic), "embedding": self._unit(embedding),
+                                     "response": response})
+            self._semantic_index.delete(normalize_question(topic))
+        self.stores += 1
+
+        try:
+            collection = await self._collection()
+            if collection is not None:
+                await collection.replace_one({"_id": key}, {
+                    "_id": key,
+                    "topic": topic,
+                    "question": question,
+                    "case_ids": list(case_ids or []),
+                    "response": response,
+                    "created_at": datetime.utcnow()
+                }, upsert=True)
+        except Exception as e:
+            logger.warning(f"Persistent response cache write failed: {e}")
+
+    @staticmethod
+    def _unit(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def clear(self):
+        self._exact.clear()
+        self._semantic.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.semantic_hits + self.persistent_hits
+        return {
+            "lookups": self.lookups,
+            "hits": hits,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.lookups - hits,
+            "hit_rate": round(hits / self.lookups, 4) if self.lookups else 0.0,
+            "stores": self.stores,
+            "semantic_threshold": self.semantic_threshold,
+            "persistent": self.persistent and database.is_database_connected(),
+            "exact_layer": self._exact.get_stats(),
+            "semantic_layer": self._semantic.get_stats(),
+        }
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import socket
+import struct
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Frames are a 4-byte big-endian length followed by a UTF-8 JSON body
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+_REMOTE_EXCEPTIONS = {"ValueError": ValueError, "KeyError": KeyError, "RuntimeError": RuntimeError}
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    body = json.dumps(message).encode("utf-8")
+    return FRAME_HEADER.pack(len(body)) + body
+
+def decode_body(body: bytes) -> Dict[str, Any]:
+    return json.loads(body.decode("utf-8"))
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    return decode_body(await reader.readexactly(length))
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks, remaining = [], size
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            raise ConnectionError("Retrieval server closed the connection")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+def _unwrap(response: Dict[str, Any]) -> Any:
+    if response.get("ok"):
+        return response.get("result")
+    raise _REMOTE_EXCEPTIONS.get(response.get("type"), RuntimeError)(response.get("error", "Retrieval server error"))
+
+class RemoteRAGService:
+    """
+    RAGService stand-in that forwards calls to the retrieval sidecar.
+
+    Used by uvicorn workers when RETRIEVAL_SOCKET is set, so the embedding
+    model and the vector index live once in the sidecar process instead of
+    once per worker (and only one process ever writes the index). Mirrors
+    the RAGService methods the API routes call.
+    """
+
+    def __init__(self, socket_path: str, connect_timeout: float = 180.0, max_idle: int = 16):
+        self.socket_path = socket_path
+        self.connect_timeout = connect_timeout
+        self.max_idle = max_idle
+        self.startup_timings: Dict[str, float] = {}
+        self._idle: List[tuple] = []
+
+    # Blocking calls (used from threads and management code)
+
+    def _call(self, method: str, **params) -> Any:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.socket_path)
+            sock.sendall(encode_frame({"method": method, "params": params}))
+            (length,) = FRAME_HEADER.unpack(_recv_exactly(sock, FRAME_HEADER.size))
+            return _unwrap(decode_body(_recv_exactly(sock, length)))
+
+    def wait_until_ready(self) -> Dict[str, Any]:
+        """Block until the sidecar answers (it binds its socket only once the model and index are loaded)"""
+        deadline = time.monotonic() + self.connect_timeout
+        delay = 0.1
+        while True:
+            try:
+                return self._call("ping")
+            except (FileNotFoundError, ConnectionError):
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(f"Retrieval server at {self.socket_path} did not come up "
+                                       f"within {self.connect_timeout}s")
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+
+    def warm_up(self):
+        info = self.wait_until_ready()
+        self.startup_timings = info.get("startup_timings", {})
+
+    # Async calls (pooled connections, one request in flight per connection)
+
+    async def _acall(self, method: str, **params) -> Any:
+        message = encode_frame({"method": method, "params": params})
+        for attempt in range(2):
+            pooled = bool(self._idle)
+            reader, writer = self._idle.pop() if pooled else await asyncio.open_unix_connection(self.socket_path)
+            try:
+                writer.write(message)
+                await writer.drain()
+                response = await read_frame(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                # An idle pooled connection may have gone stale (e.g. sidecar restart); retry once on a fresh one
+                if pooled and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            # Keep a bounded pool; connections opened during a burst beyond it are closed
+            if len(self._idle) < self.max_idle:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return _unwrap(response)
+
+    async def aencode_query(self, query: str) -> List[float]:
+        return await self._acall("encode_query", query=query)
+
+    async def asearch_similar_cases(self, query: str, n_results: int = 5, mode: Optional[str] = None,
+                                    where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return await self._acall("search_similar_cases", query=query, n_results=n_results, mode=mode, where=where)
+
+    async def asearch_passages(self, query: str, n_cases: int = 3, passages_per_case: Optional[int] = None,
+                               where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return await self._acall("search_passages", query=query, n_cases=n_cases,
+                                 passages_per_case=passages_per_case, where=where)
+
+    async def aget_cases_by_metadata(self, where: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
+        return await self._acall("get_cases_by_metadata", where=where, limit=limit)
+
+    async def aget_context_for_query(self, query: str, topic: str = None) -> List[str]:
+        return await self._acall("get_context_for_query", query=query, topic=topic)
+
+    async def aget_packed_context(self, query: str, topic: str = None,
+                                  token_budget: Optional[int] = None) -> Dict[str, Any]:
+        return await self._acall("get_packed_context", query=query, topic=topic, token_budget=token_budget)
+
+    def search_similar_cases(self, query: str, n_results: int = 5, mode: Optional[str] = None,
+                             where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self._call("search_similar_cases", query=query, n_results=n_results, mode=mode, where=where)
+
+    def search_similar_cases_batch(self, queries: List[str], n_results: int = 5, mode: Optional[str] = None,
+                                   where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        return self._call("search_similar_cases_batch", queries=queries, n_results=n_results, mode=mode, where=where)
+
+    def get_context_for_query(self, query: str, topic: str = None) -> List[str]:
+        return self._call("get_context_for_query", query=query, topic=topic)
+
+    def get_packed_context(self, query: str, topic: str = None,
+                           token_budget: Optional[int] = None) -> Dict[str, Any]:
+        return self._call("get_packed_context", query=query, topic=topic, token_budget=token_budget)
+
+    def sync_corpus(self, data_dir: Optional[str] = None, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        return self._call("sync_corpus", data_dir=data_dir, batch_size=batch_size)
+
+    def ingest_directory(self, data_dir: str, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        # Runs in the sidecar, the index's only writer, so workers see the new cases immediately
+        return self._call("ingest_directory", data_dir=data_dir, batch_size=batch_size)
+
+    async def ping(self, timeout: float = 1.0) -> bool:
+        """True if the sidecar answers within `timeout`"""
+        try:
+            await asyncio.wait_for(self._acall("ping"), timeout)
+            return True
+        except (OSError, ConnectionError, asyncio.TimeoutError, RuntimeError):
+            return False
+
+    async def aget_stats(self, timeout: float = 5.0) -> Dict[str, Any]:
+        """Sidecar statistics without blocking the event loop; an error entry if it doesn't answer in time"""
+        try:
+            stats = await asyncio.wait_for(self._acall("get_stats"), timeout)
+        except (OSError, ConnectionError, asyncio.TimeoutError) as e:
+            return {"retrieval_socket": self.socket_path, "error": str(e) or type(e).__name__}
+        return {"retrieval_socket": self.socket_path, "idle_connections": len(self._idle), **stats}
+
+    def get_stats(self) -> Dict[str, Any]:
+        try:
+            return {"retrieval_socket": self.socket_path, **self._call("get_stats")}
+        except (OSError, ConnectionError) as e:
+            return {"retrieval_socket": self.socket_path, "error": str(e)}
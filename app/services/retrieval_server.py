@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict
+
+from app.services.retrieval_client import encode_frame, read_frame
+from app.utils.memory import rss_mb
+
+logger = logging.getLogger(__name__)
+
+# Wire method -> RAGService coroutine; these share the sidecar's micro-batcher across all workers
+ASYNC_METHODS = {
+    "encode_query": "aencode_query",
+    "search_similar_cases": "asearch_similar_cases",
+    "search_passages": "asearch_passages",
+    "get_cases_by_metadata": "aget_cases_by_metadata",
+    "get_context_for_query": "aget_context_for_query",
+    "get_packed_context": "aget_packed_context",
+}
+
+# Wire method -> blocking RAGService method, run off the event loop
+BLOCKING_METHODS = {
+    "search_similar_cases_batch": "search_similar_cases_batch",
+    "sync_corpus": "sync_corpus",
+    "ingest_directory": "ingest_directory",
+}
+
+class RetrievalServer:
+    """
+    Serves one RAGService (embedding model + vector index) to every uvicorn
+    worker over a Unix socket, so N workers cost one model's worth of RSS
+    and the index has a single writer.
+    """
+
+    def __init__(self, rag_service):
+        self.rag_service = rag_service
+        self.requests = 0
+        self.errors = 0
+
+    async def dispatch(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "ping":
+            return {"pid": os.getpid(), "startup_timings": self.rag_service.startup_timings}
+        if method == "get_stats":
+            return {
+                **self.rag_service.get_stats(),
+                "server": {"pid": os.getpid(), "rss_mb": round(rss_mb(), 1),
+                           "requests": self.requests, "errors": self.errors}
+            }
+        if method in ASYNC_METHODS:
+            return await getattr(self.rag_service, ASYNC_METHODS[method])(**params)
+        if method in BLOCKING_METHODS:
+            return await asyncio.to_thread(getattr(self.rag_service, BLOCKING_METHODS[method]), **params)
+        raise ValueError(f"Unknown retrieval method: {method}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break  # client closed the connection
+                self.requests += 1
+                try:
+                    result = await self.dispatch(request.get("method"), request.get("params") or {})
+                    frame = encode_frame({"ok": True, "result": result})
+                except Exception as e:
+                    self.errors += 1
+                    frame = encode_frame({"ok": False, "type": type(e).__name__, "error": str(e)})
+                writer.write(frame)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def serve(socket_path: str):
+    """Load the model and index, then accept worker connections on socket_path"""
+    from app.services.rag_service import RAGService
+
+    rag_service = await asyncio.to_thread(RAGService)
+    await asyncio.to_thread(rag_service.warm_up)
+    server = RetrievalServer(rag_service)
+
+    # Bind only once loaded: workers treat a missing/refusing socket as "still starting"
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    unix_server = await asyncio.start_unix_server(server.handle_connection, path=socket_path)
+    os.chmod(socket_path, 0o600)
+    logger.info(f"🔌 Retrieval server listening on {socket_path} (pid {os.getpid()}, {rss_mb():.0f} MB RSS)")
+    try:
+        async with unix_server:
+            await unix_server.serve_forever()
+    finally:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
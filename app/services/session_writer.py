@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.utils.latency import latency_histogram
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class SessionWriter:
+    """
+    Write-behind persistence for chat turns.
+
+    Request handlers enqueue each exchange and return without a Mongo
+    round trip. A background task flushes the queue with one unordered
+    bulk_write once `batch_size` turns are waiting or `flush_interval`
+    seconds have passed since the first one, folding several turns of the
+    same session into a single `$push` upsert. The queue is bounded: when it
+    is full the turn is dropped and counted rather than stalling requests.
+    Turns not yet flushed are visible through pending_messages() so this
+    process reads its own writes.
+    """
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 200, flush_interval: float = 0.25):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "flushes": 0,
+                      "largest_batch": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Session writer started (batch {self.batch_size}, every {self.flush_interval}s)")
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush everything queued, then stop"""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Session writer did not drain within {timeout}s; "
+                           f"{self._queue.qsize()} queued turns lost")
+            self._task.cancel()
+        logger.info(f"Session writer stopped ({self.stats['written']} turns written, "
+                    f"{self.stats['dropped']} dropped, {self.stats['failed']} failed)")
+
+    def enqueue(self, session_id: str, messages: List[Dict[str, Any]], topic: Optional[str] = None,
+                sources: Optional[List[str]] = None) -> bool:
+        """Queue one exchange for the session; False if the queue is full and it was dropped"""
+        try:
+            self._queue.put_nowait({"session_id": session_id, "messages": messages, "topic": topic,
+                                    "sources": sources or [], "queued_at": datetime.now()})
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning(f"Session writer queue full; dropped a turn of session {session_id}")
+            return False
+        self._pending.setdefault(session_id, []).extend(messages)
+        self.stats["enqueued"] += 1
+        return True
+
+    def pending_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        """Messages of this session queued or being flushed, oldest first"""
+        return list(self._pending.get(session_id, []))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            flush_at = loop.time() + self.flush_interval
+            stopping = False
+            while len(batch) < self.batch_size:
+                timeout = flush_at - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stopping:
+                # Drain whatever is left without waiting on the interval
+                remaining = []
+                while not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is not _STOP:
+                        remaining.append(item)
+                for start in range(0, len(remaining), self.batch_size):
+                    await self._flush(remaining[start:start + self.batch_size])
+                return
+
+    def _operations(self, batch: List[Dict[str, Any]]) -> List[UpdateOne]:
+        # One upsert per session, its turns appended in arrival order
+        sessions: Dict[str, Dict[str, Any]] = {}
+        for item in batch:
+            session = sessions.setdefault(item["session_id"], {"messages": [], "topic": item["topic"],
+                                                               "created_at": item["queued_at"]})
+            session["messages"].extend(item["messages"])
+            session["sources"] = item["sources"]
+            session["updated_at"] = item["queued_at"]
+        return [UpdateOne(
+            {"id": session_id},
+            {
+                "$push": {"messages": {"$each": session["messages"]}},
+                "$inc": {"message_count": len(session["messages"])},
+                "$set": {"sources": session["sources"], "updated_at": session["updated_at"]},
+                "$setOnInsert": {"user_id": "anonymous", "topic": session["topic"] or "general",
+                                 "summary": "", "summarized_messages": 0, "created_at": session["created_at"]}
+            },
+            upsert=True
+        ) for session_id, session in sessions.items()]
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            db = await get_database()
+            if db is None:
+                raise RuntimeError("database not connected")
+            operations = self._operations(batch)
+            for attempt in range(2):
+                try:
+                    await db.chat_sessions.bulk_write(operations, ordered=False)
+                    break
+                except Exception as e:
+                    # $push/$inc aren't idempotent, so only retry when no server was reached
+                    if attempt or not isinstance(e, ServerSelectionTimeoutError):
+                        raise
+                    await asyncio.sleep(0.5)
+            self.stats["written"] += len(batch)
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            logger.warning(f"Session writer flush of {len(batch)} turns failed: {e}")
+        finally:
+            self.stats["flushes"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+            latency_histogram("session_writer.flush").record(time.perf_counter() - started)
+            for item in batch:
+                pending = self._pending.get(item["session_id"])
+                if pending is not None:
+                    del pending[:len(item["messages"])]
+                    if not pending:
+                        del self._pending[item["session_id"]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "flush_latency": latency_histogram("session_writer.flush").get_stats()
+        }
+
+session_writer = SessionWriter(
+    max_queue=settings.session_writer_max_queue,
+    batch_size=settings.session_writer_batch_size,
+    flush_interval=settings.session_writer_flush_seconds
+)
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one upstream call.
+
+    The first caller for a key starts `fn()` as a task; callers arriving
+    while it is still running await the same task and receive its result
+    or exception. Nothing is remembered once the call finishes, so this
+    only deduplicates work that is in flight at the same time.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.largest_group = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda finished, key=key: self._finish(key, finished))
+        else:
+            self.coalesced += 1
+        self._waiters[key] += 1
+        self.largest_group = max(self.largest_group, self._waiters[key])
+        # Shield so one caller going away (e.g. client disconnect) doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+            del self._waiters[key]
+        if task.cancelled() or task.exception() is not None:
+            self.errors += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "upstream_calls": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "in_flight": len(self._in_flight),
+            "largest_group": self.largest_group,
+            "saved_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+        }
@@ -0,0 +1,313 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORES = ("chroma", "numpy")
+
+SIDECAR_VERSION = 1
+
+# Rows scored per matrix product; bounds the float32 temporaries for float16 stores
+SCORE_BLOCK_ROWS = 16384
+
+def _matches(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """Evaluate the Chroma `where` subset RAGService uses: equality, $eq, $in and $and"""
+    for field, condition in where.items():
+        if field == "$and":
+            if not all(_matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            if "$in" in condition and metadata.get(field) not in condition["$in"]:
+                return False
+            if "$eq" in condition and metadata.get(field) != condition["$eq"]:
+                return False
+        elif metadata.get(field) != condition:
+            return False
+    return True
+
+class NumpyVectorStore:
+    """
+    Exact cosine top-k search over a contiguous embedding matrix.
+
+    Embeddings are L2-normalised on write and persisted as `<name>.npy`,
+    which is memory-mapped on load (so several worker processes share one
+    copy through the page cache), next to a `<name>.json` sidecar holding
+    ids, documents and metadata. A query is one matrix product plus
+    `argpartition`, returning real cosine distances.
+
+    Implements the part of the Chroma collection API RAGService uses
+    (count, get, upsert, delete, query), so the two are interchangeable.
+    Writes are buffered in memory until `persist()` is called.
+
+    Queries score against a snapshot taken under the lock and do the matrix
+    product and top-k outside it, so concurrent queries run in parallel.
+    That relies on writers never changing live rows of a matrix or list a
+    snapshot may hold: they append past `_size` or swap in a copy.
+    """
+
+    metadata = {"hnsw:space": "cosine"}
+
+    def __init__(self, directory: str, name: str, dtype: str = "float32"):
+        self.name = name
+        self.matrix_path = os.path.join(directory, f"{name}.npy")
+        self.sidecar_path = os.path.join(directory, f"{name}.json")
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._row_of: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None  # rows [0, _size) are live; the rest is spare capacity
+        self._size = 0
+        self._dirty = False
+        self._field_index: Dict[str, Dict[Any, np.ndarray]] = {}
+        self.exists = os.path.exists(self.sidecar_path)
+        if self.exists:
+            self._load()
+
+    def _load(self):
+        with open(self.sidecar_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        matrix = np.load(self.matrix_path, mmap_mode='r')
+        if sidecar.get("version") != SIDECAR_VERSION or matrix.shape[0] != len(sidecar["ids"]):
+            raise ValueError(f"{self.matrix_path} does not match its sidecar; re-run `python manage.py reindex`")
+        if matrix.dtype != self.dtype:
+            logger.warning(f"{self.matrix_path} is {matrix.dtype}, not {self.dtype}; it is converted on the next write")
+        self._ids = sidecar["ids"]
+        self._documents = sidecar["documents"]
+        self._metadatas = sidecar["metadatas"]
+        self._row_of = {case_id: row for row, case_id in enumerate(self._ids)}
+        self._matrix = matrix
+        self._size = matrix.shape[0]
+        logger.info(f"Memory-mapped {self._size} vectors from {self.matrix_path}")
+
+    def count(self) -> int:
+        return self._size
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    def _writable(self, rows_needed: int, dimension: int):
+        """Make the matrix an in-memory buffer (leaving the memmap) with room for rows_needed rows"""
+        if self._size and self._matrix.shape[1] != dimension:
+            raise ValueError(f"Embedding dimension {dimension} does not match the store's {self._matrix.shape[1]}")
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        in_memory = (self._matrix is not None and not isinstance(self._matrix, np.memmap)
+                     and self._matrix.dtype == self.dtype and self._matrix.shape[1] == dimension)
+        if in_memory and rows_needed <= capacity:
+            return
+        # Grow geometrically so batched ingestion copies the matrix O(log n) times
+        new_capacity = max(rows_needed, capacity * 2 if rows_needed > capacity else capacity, 1024)
+        buffer = np.empty((new_capacity, dimension), dtype=self.dtype)
+        if self._size:
+            buffer[:self._size] = self._matrix[:self._size]
+        self._matrix = buffer
+
+    def _invalidate(self):
+        self._dirty = True
+        self._field_index = {}
+
+    def upsert(self, ids: List[str], embeddings: Sequence[Sequence[float]],
+               documents: Optional[List[str]] = None, metadatas: Optional[List[Dict[str, Any]]] = None):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("Expected one embedding per id")
+        vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        documents = documents or [""] * len(ids)
+        metadatas = metadatas or [{} for _ in ids]
+
+        with self._lock:
+            new_ids = [case_id for case_id in dict.fromkeys(ids) if case_id not in self._row_of]
+            live_size = self._size
+            matrix = self._matrix
+            self._writable(self._size + len(new_ids), vectors.shape[1])
+            if any(self._row_of[case_id] < live_size for case_id in ids if case_id in self._row_of):
+                # Overwriting live rows: copy first so in-flight queries keep a consistent snapshot
+                if self._matrix is matrix:
+                    self._matrix = self._matrix.copy()
+                self._documents = list(self._documents)
+                self._metadatas = list(self._metadatas)
+            for case_id in new_ids:
+                self._row_of[case_id] = self._size
+                self._ids.append(case_id)
+                self._documents.append("")
+                self._metadatas.append({})
+                self._size += 1
+            rows = [self._row_of[case_id] for case_id in ids]
+            self._matrix[rows] = vectors
+            for row, document, metadata in zip(rows, documents, metadatas):
+                self._documents[row] = document
+                self._metadatas[row] = metadata
+            self._invalidate()
+
+    def _rows_for(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        if ids is not None:
+            rows = np.array([self._row_of[case_id] for case_id in ids if case_id in self._row_of], dtype=np.int64)
+        else:
+            rows = np.arange(self._size, dtype=np.int64)
+        if where:
+            rows = np.intersect1d(rows, self._filter_rows(where), assume_unique=True)
+        return rows
+
+    def _filter_rows(self, where: Dict[str, Any]) -> np.ndarray:
+        """Rows matching `where`; single-field equality and $in use a cached per-field index"""
+        clauses = where["$and"] if set(where) == {"$and"} else [{field: value} for field, value in where.items()]
+        rows = None
+        for clause in clauses:
+            (field, condition), = clause.items()
+            if field.startswith("$") or (isinstance(condition, dict) and set(condition) - {"$in", "$eq"}):
+                matched = np.array([row for row in range(self._size) if _matches(self._metadatas[row], clause)],
+                                   dtype=np.int64)
+            else:
+                index = self._field_rows(field)
+                if isinstance(condition, dict):
+                    values = condition.get("$in", [condition.get("$eq")])
+                else:
+                    values = [condition]
+                parts = [index[value] for value in values if value in index]
+                matched = np.unique(np.concatenate(parts)) if parts else np.array([], dtype=np.int64)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+        return rows if rows is not None else np.arange(self._size, dtype=np.int64)
+
+    def _field_rows(self, field: str) -> Dict[Any, np.ndarray]:
+        index = self._field_index.get(field)
+        if index is None:
+            grouped: Dict[Any, List[int]] = {}
+            for row in range(self._size):
+                value = self._metadatas[row].get(field)
+                if value is not None:
+                    grouped.setdefault(value, []).append(row)
+            index = {value: np.array(rows, dtype=np.int64) for value, rows in grouped.items()}
+            self._field_index[field] = index
+        return index
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            if ids is None and where is None:
+                return
+            rows = self._rows_for(ids, where)
+            if len(rows) == 0:
+                return
+            keep = np.ones(self._size, dtype=bool)
+            keep[rows] = False
+            kept_rows = np.flatnonzero(keep)
+            # A new buffer rather than compacting in place, which would shift rows under in-flight queries
+            self._matrix = np.array(self._matrix[kept_rows], dtype=self.dtype)
+            self._ids = [self._ids[row] for row in kept_rows]
+            self._documents = [self._documents[row] for row in kept_rows]
+            self._metadatas = [self._metadatas[row] for row in kept_rows]
+            self._row_of = {case_id: row for row, case_id in enumerate(self._ids)}
+            self._size = len(kept_rows)
+            self._invalidate()
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None,
+            include: Sequence[str] = ("documents", "metadatas")) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._rows_for(ids, where)
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+            result: Dict[str, Any] = {"ids": [self._ids[row] for row in rows]}
+            if "documents" in include:
+                result["documents"] = [self._documents[row] for row in rows]
+            if "metadatas" in include:
+                result["metadatas"] = [self._metadatas[row] for row in rows]
+            if "embeddings" in include:
+                result["embeddings"] = np.asarray(self._matrix[rows], dtype=np.float32).tolist()
+            return result
+
+    @staticmethod
+    def _scores(matrix: np.ndarray, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Cosine scores against the live `matrix`, shape (len(queries), candidate rows), computed block by block"""
+        total = len(matrix) if rows is None else len(rows)
+        scores = np.empty((len(queries), total), dtype=np.float32)
+        for start in range(0, total, SCORE_BLOCK_ROWS):
+            stop = min(start + SCORE_BLOCK_ROWS, total)
+            block = matrix[start:stop] if rows is None else matrix[rows[start:stop]]
+            scores[:, start:stop] = queries @ np.asarray(block, dtype=np.float32).T
+        return scores
+
+    def query(self, query_embeddings: Sequence[Sequence[float]], n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None,
+              include: Sequence[str] = ("documents", "metadatas", "distances")) -> Dict[str, Any]:
+        """Exact top-k for every query embedding; results are nested one list per query, like Chroma"""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+
+        # Only the snapshot is taken under the lock; scoring and top-k run outside it
+        with self._lock:
+            rows = self._rows_for(where=where) if where else None
+            size = self._size
+            matrix = self._matrix[:size] if self._matrix is not None else None
+            ids, documents, metadatas = self._ids, self._documents, self._metadatas
+
+        candidates = size if rows is None else len(rows)
+        k = min(n_results, candidates)
+        result: Dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if k == 0:
+            for key in result:
+                result[key] = [[] for _ in queries]
+            return result
+
+        scores = self._scores(matrix, queries, rows)
+        if k < candidates:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(candidates), (len(queries), 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for positions, query_scores in zip(top, top_scores):
+            hit_rows = positions if rows is None else rows[positions]
+            result["ids"].append([ids[row] for row in hit_rows])
+            result["documents"].append([documents[row] for row in hit_rows])
+            result["metadatas"].append([metadatas[row] for row in hit_rows])
+            result["distances"].append([float(1.0 - score) for score in query_scores])
+        return result
+
+    def persist(self):
+        """Write the matrix and sidecar (atomically, each) and re-open the matrix memory-mapped"""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.matrix_path) or ".", exist_ok=True)
+            dimension = self.dimension or 0
+            matrix = self._matrix[:self._size] if self._matrix is not None else np.zeros((0, dimension), dtype=self.dtype)
+
+            # np.save appends ".npy" to names without it, so keep the suffix on the temp file
+            tmp_matrix = self.matrix_path[:-4] + ".tmp.npy"
+            np.save(tmp_matrix, np.ascontiguousarray(matrix, dtype=self.dtype))
+            tmp_sidecar = self.sidecar_path + ".tmp"
+            with open(tmp_sidecar, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": SIDECAR_VERSION,
+                    "ids": self._ids,
+                    "documents": self._documents,
+                    "metadatas": self._metadatas
+                }, f)
+            os.replace(tmp_matrix, self.matrix_path)
+            os.replace(tmp_sidecar, self.sidecar_path)
+
+            self._matrix = np.load(self.matrix_path, mmap_mode='r')
+            self._dirty = False
+            self.exists = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "vectors": self._size,
+            "dimension": self.dimension,
+            "dtype": str(self.dtype),
+            "memory_mapped": isinstance(self._matrix, np.memmap),
+            "matrix_mb": round(self._size * (self.dimension or 0) * self.dtype.itemsize / (1024 * 1024), 2),
+            "unpersisted_changes": self._dirty
+        }
@@ -0,0 +1,92 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List
+
+CASE_FILE_EXTENSIONS = ('.json', '.jsonl')
+
+def list_case_files(data_dir: str) -> List[str]:
+    """List case files (.json / .jsonl) in a directory, sorted for stable ordering"""
+    if not os.path.isdir(data_dir):
+        return []
+    return [
+        os.path.join(data_dir, filename)
+        for filename in sorted(os.listdir(data_dir))
+        if filename.endswith(CASE_FILE_EXTENSIONS)
+    ]
+
+def iter_jsonl_cases(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield cases from a JSON Lines file, one object per line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def iter_json_array_cases(path: str, chunk_size: int = 65536) -> Iterator[Dict[str, Any]]:
+    """
+    Yield cases from a JSON file without loading the whole file into memory.
+
+    The file may contain a top-level array of case objects or a single case
+    object. Array elements are decoded incrementally as chunks are read.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip(chars: str) -> None:
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in chars:
+                    pos += 1
+                if pos < len(buffer) or not fill():
+                    return
+
+        skip(" \t\r\n")
+        if pos >= len(buffer):
+            return  # Empty file
+
+        if buffer[pos] != '[':
+            # Single top-level object
+            while not eof:
+                fill()
+            yield json.loads(buffer[pos:])
+            return
+
+        pos += 1
+        while True:
+            skip(" \t\r\n,")
+            if pos >= len(buffer):
+                raise ValueError(f"Unterminated JSON array in {path}")
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            pos = end
+            yield item
+
+def iter_case_file(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield cases from a single .json or .jsonl file"""
+    if path.endswith('.jsonl'):
+        return iter_jsonl_cases(path)
+    return iter_json_array_cases(path)
+
+def iter_cases(data_dir: str) -> Iterator[Dict[str, Any]]:
+    """Stream all cases from every case file in a directory"""
+    for path in list_case_files(data_dir):
+        yield from iter_case_file(path)
@@ -0,0 +1,43 @@
+import asyncio
+import time
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request's deadline passed before the awaited step finished"""
+
+class Deadline:
+    """
+    Absolute point in time by which a request must be answered.
+
+    Created once per request and passed down, so every step (retrieval,
+    LLM call, fallback) waits only for what is left of the overall budget
+    rather than a fresh timeout of its own.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.expires_at = self.started + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    async def run(self, awaitable: Awaitable[T], limit: Optional[float] = None) -> T:
+        """
+        Await `awaitable` for at most the remaining time (or `limit`, if
+        sooner); cancels it and raises DeadlineExceeded on timeout.
+        """
+        timeout = self.remaining() if limit is None else min(limit, self.remaining())
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded(f"Deadline of {self.seconds:.1f}s exceeded after {self.elapsed():.2f}s") from e
@@ -0,0 +1,74 @@
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+# Upper bounds (ms) of the histogram buckets, roughly log-spaced; the last bucket is open-ended
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 7500, 10000, 15000,
+                      20000, 30000, 60000)
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (constant memory, thread-safe).
+
+    Percentiles are estimated by linear interpolation inside the bucket
+    they fall in, which is plenty to compare tails before and after a
+    change.
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.bounds = list(buckets_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= target:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max_ms
+                return round(min(self.max_ms, lower + (upper - lower) * (target - seen) / bucket_count), 1)
+            seen += bucket_count
+        return round(self.max_ms, 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total_ms / self.count, 1) if self.count else None,
+                "p50_ms": self.percentile(0.50),
+                "p90_ms": self.percentile(0.90),
+                "p95_ms": self.percentile(0.95),
+                "p99_ms": self.percentile(0.99),
+                "max_ms": round(self.max_ms, 1),
+                "buckets": {f"le_{bound}": count for bound, count in zip(self.bounds, self.counts) if count},
+                "overflow": self.counts[-1],
+            }
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+def latency_histogram(name: str) -> LatencyHistogram:
+    """The process-wide histogram registered under `name` (created on first use)"""
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(name, LatencyHistogram())
+    return histogram
+
+def latency_stats(names: Optional[List[str]] = None) -> Dict[str, Any]:
+    return {name: histogram.get_stats() for name, histogram in sorted(_histograms.items())
+            if names is None or name in names}
@@ -0,0 +1,36 @@
+import os
+from typing import Dict, List, Union
+
+def rss_mb(pid: Union[int, str] = "self") -> float:
+    """Resident set size of a process in MB (Linux /proc; peak RSS of this process elsewhere)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        if pid not in ("self", os.getpid()):
+            return 0.0
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def child_pids(pid: int) -> List[int]:
+    """All descendants of a process (Linux /proc only)"""
+    parents: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the ppid is the second field after it
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+
+    descendants, stack = [], [pid]
+    while stack:
+        for child in parents.get(stack.pop(), []):
+            descendants.append(child)
+            stack.append(child)
+    return descendants
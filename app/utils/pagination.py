@@ -0,0 +1,79 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+class InvalidCursor(ValueError):
+    """The `next` token is malformed or was issued for a different listing"""
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$date" in value:
+            return datetime.fromisoformat(value["$date"])
+        if "$oid" in value:
+            return ObjectId(value["$oid"])
+    return value
+
+def encode_cursor(sort_field: str, sort_value: Any, document_id: Any) -> str:
+    """Opaque token for the position just after this document"""
+    payload = json.dumps({"f": sort_field, "v": _encode_value(sort_value), "id": _encode_value(document_id)},
+                         separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str, sort_field: str) -> Tuple[Any, Any]:
+    """(sort value, _id) of the last document of the previous page"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if payload["f"] != sort_field:
+            raise InvalidCursor(f"Cursor was issued for a listing sorted by {payload['f']}")
+        return _decode_value(payload["v"]), _decode_value(payload["id"])
+    except InvalidCursor:
+        raise
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+
+def keyset_filter(sort_field: str, sort_value: Any, document_id: Any) -> Dict[str, Any]:
+    """Documents after (sort_value, document_id) in descending (sort_field, _id) order"""
+    return {"$or": [
+        {sort_field: {"$lt": sort_value}},
+        {sort_field: sort_value, "_id": {"$lt": document_id}}
+    ]}
+
+async def paginate(collection, query: Dict[str, Any], sort_field: str, projection: Dict[str, Any],
+                   limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of `collection`, newest first by (sort_field, _id).
+
+    Keyset rather than skip/limit: each page is an index range scan starting
+    where the previous one ended, so deep pages cost the same as the first
+    and concurrent inserts don't shift or repeat rows. Returns the documents
+    (with `_id` removed) and the token for the next page, None on the last.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort_field, *decode_cursor(cursor, sort_field))]}
+    documents = await collection.find(query, projection).sort(
+        [(sort_field, -1), ("_id", -1)]
+    ).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_cursor(sort_field, last.get(sort_field), last["_id"])
+    for document in documents:
+        document.pop("_id", None)
+    return documents, next_cursor
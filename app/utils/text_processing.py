@@ -70,4 +70,61 @@ def summarize_case_facts(text: str, max_sentences: int = 3) -> str:
 
 def format_legal_citation(case_name: str, citation: str, year: int) -> str:
     """Format a legal citation properly"""
-    return f"{case_name}, {citation} ({year})"
\ No newline at end of file
+    return f"{case_name}, {citation} ({year})"
+
+# Abbreviations whose trailing period does not end a sentence ("Mrs. Carlill", "Smith v. Jones")
+SENTENCE_ABBREVIATIONS = frozenset({"mr", "mrs", "ms", "dr", "v", "vs", "co", "ltd", "inc", "no", "st", "j", "lj", "cf"})
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences without breaking after common legal/name abbreviations"""
+    sentences: List[str] = []
+    for fragment in re.split(r'(?<=[.!?])\s+', text.strip()):
+        if not fragment:
+            continue
+        if sentences:
+            last_word = sentences[-1].rsplit(None, 1)[-1].rstrip('.').lower()
+            if sentences[-1].endswith('.') and last_word in SENTENCE_ABBREVIATIONS:
+                sentences[-1] = f"{sentences[-1]} {fragment}"
+                continue
+        sentences.append(fragment)
+    return sentences
+
+def split_into_passages(text: str, max_words: int = 120, overlap_words: int = 30) -> List[str]:
+    """
+    Split text into overlapping passages of at most `max_words` words.
+
+    Passages break on sentence boundaries where possible; consecutive
+    passages share roughly `overlap_words` words of trailing context.
+    Sentences longer than `max_words` are split on word boundaries.
+    """
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if s.strip()]
+    
+    # Break up any sentence that alone exceeds the passage size
+    pieces = []
+    for sentence in sentences:
+        words = sentence.split()
+        for start in range(0, len(words), max_words):
+            pieces.append(words[start:start + max_words])
+    
+    passages = []
+    current: List[List[str]] = []
+    current_len = 0
+    for words in pieces:
+        if current and current_len + len(words) > max_words:
+            passages.append(' '.join(' '.join(p) for p in current))
+            # Carry trailing sentences forward as overlap
+            carried = []
+            carried_len = 0
+            for previous in reversed(current):
+                if carried_len + len(previous) > min(overlap_words, max_words - len(words)):
+                    break
+                carried.insert(0, previous)
+                carried_len += len(previous)
+            current, current_len = carried, carried_len
+        current.append(words)
+        current_len += len(words)
+    
+    if current:
+        passages.append(' '.join(' '.join(p) for p in current))
+    
+    return passages
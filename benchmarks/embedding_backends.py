@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Compare embedding backends on the bundled case corpus.
+
+Each backend runs in its own subprocess so RSS numbers aren't polluted by
+the others. Reports load time, RSS growth, single-query latency, corpus
+encoding throughput and agreement with the reference backend (embedding
+cosine and top-k retrieval overlap).
+
+Usage:
+    python benchmarks/embedding_backends.py [--backends sentence-transformers onnx ...]
+                                            [--data-dir data/cases] [--output results.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def rss_mb() -> float:
+    """Current resident set size in MB (Linux /proc, falling back to peak RSS)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentile(values, pct):
+    return float(np.percentile(values, pct)) if values else 0.0
+
+def load_corpus(data_dir: str):
+    from app.services.rag_service import build_case_text
+    from app.utils.case_loader import iter_cases
+
+    cases = list(iter_cases(data_dir))
+    documents = [build_case_text(case) for case in cases]
+    queries = []
+    for case in cases:
+        queries.extend(q for q in (case.get("issue"), case.get("rule"), case.get("case_name")) if q)
+        queries.extend(case.get("key_points", []))
+    return documents, queries
+
+def run_worker(backend: str, data_dir: str, output_path: str, min_docs: int, batch_size: int):
+    """Benchmark one backend in this process and write embeddings + stats to output_path"""
+    from app.services.embedders import create_embedder
+
+    documents, queries = load_corpus(data_dir)
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    embedder = create_embedder(backend)
+    load_seconds = time.perf_counter() - started
+    embedder.encode(["warm up"])
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        embedder.encode([query])
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    # Repeat the (small) corpus so throughput isn't dominated by fixed overhead
+    corpus = (documents * (min_docs // max(len(documents), 1) + 1))[:max(min_docs, len(documents))]
+    started = time.perf_counter()
+    embedder.encode(corpus, batch_size=batch_size)
+    encode_seconds = time.perf_counter() - started
+
+    doc_embeddings = embedder.encode(documents, batch_size=batch_size)
+    query_embeddings = embedder.encode(queries, batch_size=batch_size)
+    np.savez(output_path, documents=doc_embeddings, queries=query_embeddings)
+
+    stats = {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+        "query_latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "mean": round(float(np.mean(latencies)), 3) if latencies else 0.0,
+        },
+        "throughput_docs_per_second": round(len(corpus) / encode_seconds, 1),
+        "documents": len(documents),
+        "queries": len(queries),
+    }
+    with open(output_path + ".json", "w") as f:
+        json.dump(stats, f)
+
+def agreement(reference: dict, candidate: dict, k: int) -> dict:
+    """Embedding cosine and top-k retrieval overlap of candidate vs reference"""
+    def normalize(m):
+        return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+
+    ref_docs, cand_docs = normalize(reference["documents"]), normalize(candidate["documents"])
+    ref_queries, cand_queries = normalize(reference["queries"]), normalize(candidate["queries"])
+    k = min(k, len(ref_docs))
+    ref_top = np.argsort(-ref_queries @ ref_docs.T, axis=1)[:, :k]
+    cand_top = np.argsort(-cand_queries @ cand_docs.T, axis=1)[:, :k]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)]
+    return {
+        "mean_document_cosine": round(float(np.mean(np.sum(ref_docs * cand_docs, axis=1))), 5),
+        "mean_query_cosine": round(float(np.mean(np.sum(ref_queries * cand_queries, axis=1))), 5),
+        f"top{k}_overlap": round(float(np.mean(overlap)), 4),
+        "top1_agreement": round(float(np.mean(ref_top[:, 0] == cand_top[:, 0])), 4),
+    }
+
+def main():
+    from app.services.embedders import EMBEDDING_BACKENDS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS),
+                        help="Backends to compare; the first is the reference")
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "data", "cases"))
+    parser.add_argument("--min-docs", type=int, default=256, help="Documents encoded for the throughput run")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--output", help="Write the JSON report here as well as stdout")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.data_dir, args.worker_output, args.min_docs, args.batch_size)
+        return 0
+
+    report = {"data_dir": args.data_dir, "reference": args.backends[0], "backends": []}
+    embeddings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            output_path = os.path.join(tmp, backend)
+            cmd = [sys.executable, os.path.abspath(__file__), "--worker", backend,
+                   "--worker-output", output_path, "--data-dir", args.data_dir,
+                   "--min-docs", str(args.min_docs), "--batch-size", str(args.batch_size)]
+            result = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+            if result.returncode != 0:
+                error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+                report["backends"].append({"backend": backend, "error": error})
+                print(f"{backend}: failed ({error})", file=sys.stderr)
+                continue
+            with open(output_path + ".json") as f:
+                stats = json.load(f)
+            embeddings[backend] = dict(np.load(output_path + ".npz"))
+            report["backends"].append(stats)
+
+    reference = embeddings.get(args.backends[0])
+    for stats in report["backends"]:
+        if reference is not None and stats["backend"] in embeddings:
+            stats["agreement"] = agreement(reference, embeddings[stats["backend"]], args.top_k)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Retrieval benchmark over a synthetic case corpus.
+
+Generates cases matching the LegalCase schema (app/models/case.py) at each
+requested scale, ingests them into a fresh index for each vector store,
+and measures:
+
+  * ingestion time and throughput (RAGService.add_cases)
+  * single-query latency p50/p95/p99 of search_similar_cases per mode
+    and of get_context_for_query
+  * batched query latency (search_similar_cases_batch)
+  * process RSS after ingestion
+  * recall@k of vector search against an exact brute-force baseline
+
+Every (store, scale) pair runs in its own subprocess against a temporary
+index directory, so runs don't share memory or caches. `--fast-embedder`
+swaps the model for a deterministic hashing embedder, which makes 100k-1M
+runs about index cost rather than MiniLM throughput.
+
+Usage:
+    python benchmarks/retrieval_benchmark.py [--scales 1000 10000] [--stores chroma numpy]
+                                             [--fast-embedder] [--output results.json]
+    python benchmarks/retrieval_benchmark.py --write-corpus DIR --scales 10000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.utils.memory import rss_mb
+
+AREAS = {
+    "contract_law": {
+        "topics": ["offer and acceptance", "consideration", "breach of contract", "misrepresentation",
+                   "frustration", "promissory estoppel", "exclusion clauses", "damages for breach"],
+        "actors": ["the buyer", "the seller", "the contractor", "the supplier", "the employer", "the tenant"],
+        "objects": ["a shipment of grain", "a software licence", "a construction project", "a supply agreement",
+                    "a lease of commercial premises", "an advertisement offering a reward"],
+    },
+    "criminal_law": {
+        "topics": ["mens rea", "actus reus", "self-defence", "duress", "necessity", "diminished responsibility",
+                   "oblique intention", "causation in homicide"],
+        "actors": ["the defendant", "the accused", "the victim", "a police officer", "a bystander", "the appellant"],
+        "objects": ["a stolen vehicle", "a loaded firearm", "a custodial interrogation", "a fatal assault",
+                    "an unlawful search", "a forged cheque"],
+    },
+    "tort_law": {
+        "topics": ["duty of care", "breach of duty", "remoteness of damage", "occupiers' liability",
+                   "vicarious liability", "nuisance", "negligent misstatement", "psychiatric injury"],
+        "actors": ["the claimant", "the occupier", "the manufacturer", "the employer", "the local authority",
+                   "the driver"],
+        "objects": ["a defective product", "a collapsed wall", "a road traffic accident", "contaminated water",
+                    "an unsafe workplace", "negligent financial advice"],
+    },
+    "property_law": {
+        "topics": ["adverse possession", "easements", "restrictive covenants", "co-ownership", "mortgages",
+                   "proprietary estoppel", "leasehold covenants", "registration of title"],
+        "actors": ["the landowner", "the mortgagee", "the neighbour", "the leaseholder", "the purchaser",
+                   "the trustee"],
+        "objects": ["a right of way", "a family home", "an unregistered plot", "a shared driveway",
+                    "a boundary fence", "a commercial lease"],
+    },
+    "constitutional_law": {
+        "topics": ["separation of powers", "judicial review", "parliamentary sovereignty", "freedom of expression",
+                   "equal protection", "due process", "executive privilege", "federalism"],
+        "actors": ["the government", "the minister", "the petitioner", "the state legislature", "the agency",
+                   "the respondent"],
+        "objects": ["an emergency regulation", "a prorogation of parliament", "a segregation statute",
+                    "a surveillance programme", "a campaign finance law", "a deportation order"],
+    },
+}
+COURTS = ["Supreme Court", "Court of Appeal", "High Court", "House of Lords", "Crown Court",
+          "Court of King's Bench", "Federal Circuit"]
+SURNAMES = ["Smith", "Jones", "Patel", "Nguyen", "Okafor", "Garcia", "Muller", "Rossi", "Kowalski", "Tanaka",
+            "Brown", "Wilson", "Singh", "Cohen", "Murphy", "Haddad", "Larsen", "Silva", "Novak", "Ahmed"]
+OUTCOMES = ["was liable", "was not liable", "succeeded on appeal", "failed on appeal",
+            "was entitled to damages", "was entitled to an injunction"]
+
+def synthetic_case(index: int, rng: random.Random) -> dict:
+    """One case matching the LegalCase schema, plus the free-text fields the bundled cases carry"""
+    area = rng.choice(list(AREAS))
+    vocab = AREAS[area]
+    topic, second_topic = rng.sample(vocab["topics"], 2)
+    actor, other = rng.sample(vocab["actors"], 2)
+    subject = rng.choice(vocab["objects"])
+    year = rng.randint(1850, 2024)
+    claimant, defendant = rng.sample(SURNAMES, 2)
+
+    facts = " ".join([
+        f"{actor.capitalize()} entered into dealings with {other} concerning {subject}.",
+        f"A dispute arose in {year} when {other} alleged that {actor} had acted contrary to the principles of {topic}.",
+        f"Evidence showed that {actor} relied on earlier assurances and incurred substantial costs.",
+        f"{other.capitalize()} argued that {second_topic} prevented any claim from succeeding.",
+        f"The trial judge found the key events occurred over {rng.randint(2, 36)} months.",
+    ])
+    holding = (f"The court held that {actor} {rng.choice(OUTCOMES)}, applying the law of {topic} "
+               f"and rejecting the argument based on {second_topic}.")
+    reasoning = " ".join([
+        f"The court examined the authorities on {topic} and distinguished earlier decisions on their facts.",
+        f"It reasoned that {subject} fell within the scope of the relevant rule.",
+        f"The argument on {second_topic} failed because the necessary elements were not established.",
+        f"Policy considerations favoured a clear and predictable rule for {area.replace('_', ' ')}.",
+    ])
+    return {
+        "id": f"synthetic_{index:07d}",
+        "case_name": f"{claimant} v. {defendant} ({index})",
+        "citation": f"[{year}] {rng.randint(1, 4)} {rng.choice(['QB', 'AC', 'WLR', 'US', 'KB'])} {rng.randint(1, 999)}",
+        "court": rng.choice(COURTS),
+        "year": year,
+        "facts": facts,
+        "holding": holding,
+        "reasoning": reasoning,
+        "area_of_law": area,
+        "keywords": [topic, second_topic, subject],
+    }
+
+def generate_cases(count: int, seed: int = 13):
+    from app.models.case import LegalCase
+
+    rng = random.Random(seed)
+    for index in range(count):
+        case = synthetic_case(index, rng)
+        if index == 0:
+            LegalCase(**case)  # fail fast if the generator drifts from the schema
+        yield case
+
+def generate_queries(count: int, seed: int = 29):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        vocab = AREAS[rng.choice(list(AREAS))]
+        queries.append(f"{rng.choice(vocab['topics'])} involving {rng.choice(vocab['objects'])} "
+                       f"and {rng.choice(vocab['actors'])}")
+    return queries
+
+def write_corpus(output_dir: str, count: int, seed: int, shard_size: int = 100000):
+    """Write the synthetic corpus as JSONL shards (ingestible with `python manage.py ingest`)"""
+    os.makedirs(output_dir, exist_ok=True)
+    shard, f = -1, None
+    for index, case in enumerate(generate_cases(count, seed)):
+        if index // shard_size != shard:
+            if f:
+                f.close()
+            shard = index // shard_size
+            f = open(os.path.join(output_dir, f"synthetic_{shard:03d}.jsonl"), "w", encoding="utf-8")
+        f.write(json.dumps(case) + "\n")
+    if f:
+        f.close()
+
+class HashingEmbedder:
+    """Deterministic bag-of-words hashing embedder for index-focused runs"""
+
+    name = "hashing"
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self._token_vectors = {}
+
+    def _vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            vector = np.random.default_rng(zlib.crc32(token.encode())).standard_normal(self.dimension)
+            vector = vector.astype(np.float32)
+            self._token_vectors[token] = vector
+        return vector
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in text.lower().split():
+                out[row] += self._vector(token)
+        return out / np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+
+def percentiles(values_ms):
+    if not values_ms:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    return {
+        "p50": round(float(np.percentile(values_ms, 50)), 3),
+        "p95": round(float(np.percentile(values_ms, 95)), 3),
+        "p99": round(float(np.percentile(values_ms, 99)), 3),
+        "mean": round(float(np.mean(values_ms)), 3),
+    }
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+def exact_top_k(collection, query_embeddings: np.ndarray, k: int, page_size: int = 5000):
+    """Brute-force cosine top-k over every stored embedding, paged to bound memory"""
+    queries = query_embeddings / np.clip(np.linalg.norm(query_embeddings, axis=1, keepdims=True), 1e-12, None)
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_ids = np.empty((len(queries), 0), dtype=object)
+    offset = 0
+    while True:
+        page = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        matrix = np.asarray(page["embeddings"], dtype=np.float32)
+        matrix /= np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+        scores = np.hstack([best_scores, queries @ matrix.T])
+        ids = np.hstack([best_ids, np.tile(np.array(page["ids"], dtype=object), (len(queries), 1))])
+        keep = np.argsort(-scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_ids = np.take_along_axis(ids, keep, axis=1)
+        offset += len(page["ids"])
+    return [list(row) for row in best_ids]
+
+def run_worker(store: str, scale: int, args, output_path: str):
+    """Benchmark one (store, scale) pair in this process; the parent set up env and index dirs"""
+    import app.services.rag_service as rag_module
+
+    if args.fast_embedder:
+        rag_module.create_embedder = lambda backend=None: HashingEmbedder()
+
+    rss_start = rss_mb()
+    rag, load_ms = timed(rag_module.RAGService)
+    ingest = rag.add_cases(generate_cases(scale, args.seed), batch_size=args.batch_size)
+    rss_after_ingest = rss_mb()
+
+    queries = generate_queries(args.queries, args.seed + 1)
+    result = {
+        "store": store,
+        "scale": scale,
+        "embedder": rag.model.name,
+        "passage_index": rag.passages is not None,
+        "load_ms": round(load_ms, 1),
+        "ingest": ingest,
+        "rss_mb": {"start": round(rss_start, 1), "after_ingest": round(rss_after_ingest, 1),
+                   "ingest_growth": round(rss_after_ingest - rss_start, 1)},
+        "single_query_ms": {},
+        "batched_query_ms": {},
+    }
+
+    # Clear the query-embedding cache before every pass so each one pays for encoding
+    for mode in args.modes:
+        rag._query_cache.clear()
+        latencies = [timed(rag.search_similar_cases, query, args.k, mode=mode)[1] for query in queries]
+        result["single_query_ms"][mode] = percentiles(latencies)
+    rag._query_cache.clear()
+    result["single_query_ms"]["context"] = percentiles(
+        [timed(rag.get_context_for_query, query)[1] for query in queries]
+    )
+
+    for batch_size in args.query_batch_sizes:
+        rag._query_cache.clear()
+        latencies = [
+            timed(rag.search_similar_cases_batch, queries[start:start + batch_size], args.k, mode="vector")[1]
+            for start in range(0, len(queries), batch_size)
+        ]
+        result["batched_query_ms"][str(batch_size)] = {
+            **percentiles(latencies),
+            "per_query_mean": round(float(np.mean(latencies)) / batch_size, 3) if latencies else 0.0,
+        }
+
+    if not args.no_recall:
+        approximate = rag.search_similar_cases_batch(queries, args.k, mode="vector")
+        query_embeddings = np.asarray(rag.encode_queries(queries), dtype=np.float32)
+        exact, exact_ms = timed(exact_top_k, rag.collection, query_embeddings, args.k)
+        recalls = [len({hit["id"] for hit in hits} & set(truth)) / max(len(truth), 1)
+                   for hits, truth in zip(approximate, exact)]
+        result[f"recall@{args.k}"] = round(float(np.mean(recalls)), 4)
+        result["exact_baseline_ms"] = round(exact_ms, 1)
+
+    result["rss_mb"]["end"] = round(rss_mb(), 1)
+    with open(output_path, "w") as f:
+        json.dump(result, f)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", type=int, default=[1000, 10000],
+                        help="Corpus sizes, e.g. 1000 10000 100000 1000000")
+    parser.add_argument("--stores", nargs="+", default=["chroma", "numpy"], choices=["chroma", "numpy"])
+    parser.add_argument("--modes", nargs="+", default=["vector", "lexical", "hybrid"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-batch-sizes", nargs="+", type=int, default=[8, 32])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=None, help="Ingest batch size (default: INGEST_BATCH_SIZE)")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--fast-embedder", action="store_true", help="Use a hashing embedder instead of the model")
+    parser.add_argument("--no-recall", action="store_true", help="Skip the exact-search recall baseline")
+    parser.add_argument("--write-corpus", metavar="DIR", help="Only write the synthetic corpus (largest scale) as JSONL")
+    parser.add_argument("--output", help="Write the JSON report here as well as stdout")
+    parser.add_argument("--worker", nargs=2, metavar=("STORE", "SCALE"), help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.write_corpus:
+        write_corpus(args.write_corpus, max(args.scales), args.seed)
+        print(f"Wrote {max(args.scales)} synthetic cases to {args.write_corpus}")
+        return 0
+    if args.worker:
+        run_worker(args.worker[0], int(args.worker[1]), args, args.worker_output)
+        return 0
+
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if not key.startswith("worker")},
+        "runs": [],
+    }
+    for scale in args.scales:
+        for store in args.stores:
+            with tempfile.TemporaryDirectory() as tmp:
+                empty_cases = os.path.join(tmp, "cases")
+                os.makedirs(empty_cases)
+                env = dict(os.environ, VECTOR_STORE=store, CASES_DATA_DIRECTORY=empty_cases,
+                           CHROMA_PERSIST_DIRECTORY=os.path.join(tmp, "chroma"),
+                           NUMPY_STORE_DIRECTORY=os.path.join(tmp, "numpy"))
+                env.pop("RETRIEVAL_SOCKET", None)
+                output_path = os.path.join(tmp, "result.json")
+                cmd = [sys.executable, os.path.abspath(__file__), "--worker", store, str(scale),
+                       "--worker-output", output_path] + sys.argv[1:]
+                started = time.perf_counter()
+                completed = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+                if completed.returncode != 0:
+                    error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "unknown error"
+                    report["runs"].append({"store": store, "scale": scale, "error": error})
+                    print(f"{store} @ {scale}: failed ({error})", file=sys.stderr)
+                    continue
+                with open(output_path) as f:
+                    run = json.load(f)
+                run["wall_seconds"] = round(time.perf_counter() - started, 1)
+                report["runs"].append(run)
+                print(f"{store} @ {scale}: {run['ingest']['cases_per_second']} cases/s ingest, "
+                      f"vector p50 {run['single_query_ms'].get('vector', {}).get('p50')} ms", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
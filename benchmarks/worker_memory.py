@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Measure server RSS as uvicorn workers are added, with and without the
+shared retrieval sidecar.
+
+For every (mode, worker count) the script starts `run.py`, waits until
+/ready has answered 200 from every worker, exercises /api/search/cases,
+then sums the RSS of the whole process tree (supervisor, workers and
+sidecar). The headline number is `rss_per_additional_worker_mb`.
+
+Linux only (reads /proc).
+
+Usage:
+    python benchmarks/worker_memory.py [--workers 1 2 4] [--modes in-process sidecar]
+                                       [--port 8099] [--output results.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.utils.memory import child_pids, rss_mb
+
+def get(url: str, timeout: float = 10.0):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None, None
+
+def process_role(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+    except OSError:
+        return "unknown"
+    if "serve-retrieval" in cmdline:
+        return "sidecar"
+    if "multiprocessing" in cmdline and "resource_tracker" in cmdline:
+        return "resource_tracker"
+    if "multiprocessing" in cmdline:
+        return "worker"
+    return "other"
+
+def wait_until_ready(base_url: str, workers: int, timeout: float) -> float:
+    """/ready is answered by whichever worker accepts; require a run of 200s to cover them all"""
+    started = time.perf_counter()
+    consecutive = 0
+    while time.perf_counter() - started < timeout:
+        status, _ = get(f"{base_url}/ready", timeout=5)
+        consecutive = consecutive + 1 if status == 200 else 0
+        if consecutive >= workers * 4:
+            return time.perf_counter() - started
+        time.sleep(0.25)
+    raise TimeoutError(f"Server not ready after {timeout}s")
+
+def measure(mode: str, workers: int, port: int, requests: int, timeout: float) -> dict:
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers),
+               RETRIEVAL_SIDECAR_ENABLED="true" if mode == "sidecar" else "false")
+    env.pop("RETRIEVAL_SOCKET", None)
+    server = subprocess.Popen([sys.executable, "run.py"], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        ready_seconds = wait_until_ready(base_url, workers, timeout)
+        for i in range(requests):
+            get(f"{base_url}/api/search/cases?q=breach+of+contract+{i}&limit=3")
+        time.sleep(1.0)
+
+        processes = [{"pid": server.pid, "role": "supervisor", "rss_mb": round(rss_mb(server.pid), 1)}]
+        for pid in child_pids(server.pid):
+            processes.append({"pid": pid, "role": process_role(pid), "rss_mb": round(rss_mb(pid), 1)})
+        return {
+            "mode": mode,
+            "workers": workers,
+            "ready_seconds": round(ready_seconds, 2),
+            "total_rss_mb": round(sum(p["rss_mb"] for p in processes), 1),
+            "worker_rss_mb": [p["rss_mb"] for p in processes if p["role"] == "worker"],
+            "sidecar_rss_mb": next((p["rss_mb"] for p in processes if p["role"] == "sidecar"), None),
+            "processes": processes,
+        }
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", default=["in-process", "sidecar"], choices=["in-process", "sidecar"])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--requests", type=int, default=20, help="Search requests sent before measuring")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for /ready")
+    parser.add_argument("--output", help="Write the JSON report here as well as stdout")
+    args = parser.parse_args()
+
+    report = {"runs": [], "summary": {}}
+    for mode in args.modes:
+        runs = []
+        for workers in sorted(args.workers):
+            # Single-worker runs never start a sidecar, so the baseline is the same in both modes
+            run = measure(mode, workers, args.port, args.requests, args.timeout)
+            print(f"{mode} x{workers}: {run['total_rss_mb']} MB", file=sys.stderr)
+            runs.append(run)
+        report["runs"].extend(runs)
+        if len(runs) > 1:
+            first, last = runs[0], runs[-1]
+            report["summary"][mode] = {
+                "rss_per_additional_worker_mb": round(
+                    (last["total_rss_mb"] - first["total_rss_mb"]) / (last["workers"] - first["workers"]), 1
+                ),
+                "total_rss_mb": {str(run["workers"]): run["total_rss_mb"] for run in runs},
+            }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
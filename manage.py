@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Management commands for Legal Education AI Backend
+
+Usage:
+    python manage.py ingest [--data-dir DIR] [--batch-size N]
+    python manage.py reindex [--data-dir DIR] [--batch-size N] [--dry-run]
+    python manage.py export-onnx [--output-dir DIR] [--no-quantize]   (pip install -r requirements-export.txt)
+    python manage.py serve-retrieval [--socket PATH]
+    python manage.py check-indexes [--ensure]
+"""
+import argparse
+import json
+import logging
+import signal
+import sys
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+def ingest(args):
+    """Bulk-load case files into the vector index"""
+    from app.core.config import settings
+    from app.services.rag_service import get_rag_service
+
+    data_dir = args.data_dir or settings.cases_data_directory
+    stats = get_rag_service().ingest_directory(data_dir, batch_size=args.batch_size)
+    print(json.dumps(stats, indent=2))
+    return 0 if stats["failed"] == 0 else 1
+
+def reindex(args):
+    """Incrementally sync the vector index with the case files"""
+    from app.core.config import settings
+    from app.services.corpus_manifest import CorpusManifest, default_manifest_path, embedding_signature
+
+    data_dir = args.data_dir or settings.cases_data_directory
+
+    # Plan from the manifest first so a no-op sync never loads the embedding model
+    signature = embedding_signature(settings.embedding_model_name, settings.embedding_backend)
+    plan = CorpusManifest.load(default_manifest_path()).plan(data_dir, signature)
+    print(json.dumps({"plan": plan}, indent=2))
+    if args.dry_run or plan["new"] + plan["changed"] + plan["removed"] == 0:
+        return 0
+
+    from app.services.rag_service import get_rag_service
+    stats = get_rag_service().sync_corpus(data_dir, batch_size=args.batch_size)
+    print(json.dumps(stats, indent=2))
+    return 0 if stats["failed"] == 0 else 1
+
+def export_onnx(args):
+    """Export the embedding model for the "onnx" / "onnx-int8" backends (needs requirements-export.txt)"""
+    from app.core.config import settings
+    from app.services.embedders import export_onnx_model
+
+    output_dir = args.output_dir or settings.onnx_model_directory
+    export_onnx_model(settings.embedding_model_name, output_dir, quantize=not args.no_quantize)
+    print(f"Exported {settings.embedding_model_name} to {output_dir}")
+    return 0
+
+def serve_retrieval(args):
+    """Run the shared embedding/search sidecar for multi-worker serving"""
+    import asyncio
+    from app.core.config import settings
+    from app.services.retrieval_server import serve
+
+    socket_path = args.socket or settings.retrieval_socket
+    if not socket_path:
+        print("No socket path: pass --socket or set RETRIEVAL_SOCKET", file=sys.stderr)
+        return 1
+    # Treat SIGTERM like Ctrl+C so the socket file is cleaned up
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(serve(socket_path))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def check_indexes(args):
+    """Explain the hot MongoDB queries and report any that scan the whole collection"""
+    import asyncio
+    from app.core.database import close_db, connect_db, get_database
+    from app.core.indexes import ensure_indexes, verify_query_plans
+
+    async def run():
+        if not await connect_db():
+            print("MongoDB is not connected: set MONGODB_URL", file=sys.stderr)
+            return 1
+        try:
+            db = await get_database()
+            if args.ensure:
+                print(json.dumps({"indexes": await ensure_indexes(db)}, indent=2))
+            plans = await verify_query_plans(db)
+            print(json.dumps({"query_plans": plans}, indent=2))
+            return 0 if all(plan["status"] == "ok" for plan in plans) else 1
+        finally:
+            await close_db()
+
+    return asyncio.run(run())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LegalMind AI management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Bulk-ingest JSON/JSONL case files")
+    ingest_parser.add_argument("--data-dir", help="Directory of case files (default: CASES_DATA_DIRECTORY)")
+    ingest_parser.add_argument("--batch-size", type=int, help="Cases per encode/upsert batch (default: INGEST_BATCH_SIZE)")
+    ingest_parser.set_defaults(func=ingest)
+
+    reindex_parser = subparsers.add_parser("reindex", help="Re-embed only new/changed cases and drop removed ones")
+    reindex_parser.add_argument("--data-dir", help="Directory of case files (default: CASES_DATA_DIRECTORY)")
+    reindex_parser.add_argument("--batch-size", type=int, help="Cases per encode/upsert batch (default: INGEST_BATCH_SIZE)")
+    reindex_parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    reindex_parser.set_defaults(func=reindex)
+
+    export_parser = subparsers.add_parser("export-onnx", help="Export the embedding model to ONNX (+ int8)")
+    export_parser.add_argument("--output-dir", help="Destination directory (default: ONNX_MODEL_DIRECTORY)")
+    export_parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 quantized copy")
+    export_parser.set_defaults(func=export_onnx)
+
+    serve_parser = subparsers.add_parser("serve-retrieval", help="Serve the embedding model and index over a Unix socket")
+    serve_parser.add_argument("--socket", help="Unix socket path (default: RETRIEVAL_SOCKET)")
+    serve_parser.set_defaults(func=serve_retrieval)
+
+    indexes_parser = subparsers.add_parser("check-indexes", help="Flag hot MongoDB queries that plan a COLLSCAN")
+    indexes_parser.add_argument("--ensure", action="store_true", help="Create missing indexes before checking")
+    indexes_parser.set_defaults(func=check_indexes)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,87 @@
 #!/usr/bin/env python3
 """
 Run script for Legal Education AI Backend
+
+Set WEB_CONCURRENCY to run several uvicorn workers. With more than one
+worker, a single retrieval sidecar (`manage.py serve-retrieval`) holds the
+embedding model and vector index and the workers query it over a Unix
+socket, instead of each loading its own copy. The sidecar is restarted
+if it exits; /ready reports 503 until it is back.
 """
+import logging
 import os
+import subprocess
+import sys
+import threading
+import time
 import uvicorn
 from app.main import app
+from app.core.config import settings
+
+def start_retrieval_sidecar(socket_path: str) -> subprocess.Popen:
+    manage_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "manage.py")
+    return subprocess.Popen([sys.executable, manage_py, "serve-retrieval", "--socket", socket_path])
+
+class SidecarSupervisor:
+    """Keeps the retrieval sidecar running, restarting it with backoff whenever it exits"""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.process = start_retrieval_sidecar(socket_path)
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="retrieval-sidecar", daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        delay = 1.0
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            code = self.process.wait()
+            if self._stopping.is_set():
+                return
+            # A sidecar that stayed up a while gets a fresh backoff
+            if time.monotonic() - started > 60:
+                delay = 1.0
+            logging.warning(f"Retrieval sidecar exited with code {code}; restarting in {delay:.0f}s")
+            if self._stopping.wait(delay):
+                return
+            delay = min(delay * 2, 30.0)
+            with self._lock:
+                if self._stopping.is_set():
+                    return
+                self.process = start_retrieval_sidecar(self.socket_path)
+                self.restarts += 1
+
+    def stop(self):
+        with self._lock:
+            self._stopping.set()
+            process = self.process
+        process.terminate()
+        process.wait(timeout=30)
 
 if __name__ == "__main__":
     # Get port from environment variable (Cloud Run sets PORT=8080)
     port = int(os.environ.get("PORT", 8080))
-    
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=port,
-        reload=False,  # Disable reload in production
-        log_level="info"
-    )
\ No newline at end of file
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+    sidecar = None
+    if workers > 1 and settings.retrieval_sidecar_enabled and not settings.retrieval_socket:
+        socket_path = f"/tmp/legalmind-retrieval-{os.getpid()}.sock"
+        sidecar = SidecarSupervisor(socket_path)
+        # Workers are spawned (not forked) and read RETRIEVAL_SOCKET from the environment
+        os.environ["RETRIEVAL_SOCKET"] = socket_path
+
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=port,
+            workers=workers,
+            reload=False,  # Disable reload in production
+            log_level="info"
+        )
+    finally:
+        if sidecar is not None:
+            sidecar.stop()